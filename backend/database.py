@@ -1,62 +1,112 @@
-from sqlalchemy import create_engine
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 
 # Get the directory where this file is located
 BASEDIR = os.path.abspath(os.path.dirname(__file__))
 
-# Create the SQLite URL (synchronous)
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASEDIR, 'chat.db')}"
-
 # Create the async SQLite URL
 ASYNC_SQLALCHEMY_DATABASE_URL = (
     f"sqlite+aiosqlite:///{os.path.join(BASEDIR, 'chat.db')}"
 )
 
-# Create synchronous engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# aiosqlite defaults to NullPool, which opens a new connection (and re-runs the
+# pragmas below) for every transaction. Use a real pool sized for many
+# concurrent websocket streams instead.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "32"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "64"))
+# Seconds to wait for a free connection before failing the request, rather
+# than the 30s default that leaves a stalled websocket hanging
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
 
 # Create async engine
 async_engine = create_async_engine(
-    ASYNC_SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
 )
 
-# Create SessionLocal class (synchronous)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _set_sqlite_pragma(dbapi_conn, _):
+    """Use WAL so readers don't block the writer and drop the extra fsyncs of
+    the default rollback journal on every commit"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
+
+event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragma)
 
 # Create AsyncSessionLocal class
 AsyncSessionLocal = sessionmaker(
     async_engine, class_=AsyncSession, expire_on_commit=False
 )
 
-# Base class for models
-Base = declarative_base()
-
-
-@contextmanager
-def get_db_context():
-    """Context manager for database sessions.
+@asynccontextmanager
+async def get_async_db_context():
+    """Async context manager for database sessions.
 
     Usage:
-        with get_db_context() as db:
+        async with get_async_db_context() as db:
             # use db session
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
+async def release_connection(db: AsyncSession) -> None:
+    """Return the session's pooled connection before a long wait.
+
+    Reads leave the session inside a transaction that holds its connection.
+    Committing ends it; loaded objects stay usable because sessions are
+    created with expire_on_commit=False, and the next query simply checks a
+    connection out again.
+    """
+    if db.in_transaction():
+        await db.commit()
+
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Session.info key marking an open transactional() block
+IN_TRANSACTION = "in_transactional_block"
+
+
+@asynccontextmanager
+async def transactional(db: AsyncSession):
+    """Group several repository writes into a single transaction.
+
+    Inside the block repositories flush instead of committing, and everything
+    is committed once on exit (or rolled back on error). Nested blocks join
+    the outermost one.
+
+    Usage:
+        async with transactional(db):
+            # several repository writes
+    """
+    if db.info.get(IN_TRANSACTION):
+        yield db
+        return
+
+    db.info[IN_TRANSACTION] = True
     try:
         yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
     finally:
-        db.close()
+        db.info.pop(IN_TRANSACTION, None)
@@ -0,0 +1,24 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import get_async_db
+from .services.conversation_service import ConversationService
+from .services.message_service import MessageService
+from .services.user_service import UserService
+
+# FastAPI caches get_async_db per request, so every service injected into the
+# same request shares one session.
+
+
+def get_user_service(db: AsyncSession = Depends(get_async_db)) -> UserService:
+    return UserService(db)
+
+
+def get_conversation_service(
+    db: AsyncSession = Depends(get_async_db),
+) -> ConversationService:
+    return ConversationService(db)
+
+
+def get_message_service(db: AsyncSession = Depends(get_async_db)) -> MessageService:
+    return MessageService(db)
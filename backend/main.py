@@ -1,12 +1,18 @@
+import asyncio
+import atexit
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from . import models
-from .database import engine
+from .database import async_engine, get_async_db_context
 
 from .routes.base_routes import router as base_router
 from .routes.chat_routes import router as chat_router
@@ -15,16 +21,43 @@ from .routes.websockets.vision import router as ws_vision_router
 
 from .ml.factory import ModelFactory
 from .ml.config import MODEL_CONFIGS
+from .services.user_service import UserService
 from .utils.image_utils import UPLOADS_DIR, ensure_upload_dir
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Configure logging. Records are handed to a background thread through a
+# queue so writing to stderr never blocks the event loop; force replaces the
+# handler installed by modules imported above
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 )
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+# The queue side only merges the message arguments; the listener's handler
+# applies the real format
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler], force=True)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Create missing tables at startup; disable where the schema is managed
+# separately so workers don't repeat the introspection on every boot
+AUTO_CREATE_TABLES = os.environ.get("AUTO_CREATE_TABLES", "1") == "1"
+# Run a dummy generation per model at startup so the first user request
+# doesn't pay the cold-start costs; disable for faster reloads in development
+WARMUP = os.environ.get("WARMUP", "1") == "1"
+
+
+def create_tables(connection) -> None:
+    models.Base.metadata.create_all(bind=connection)
+    # create_all skips tables that already exist, so add any indexes introduced
+    # since the database was first created
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
 
 # Ensure the uploads directory exists
 ensure_upload_dir()
@@ -32,19 +65,53 @@ ensure_upload_dir()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Register all models from config
-    for model_id, config in MODEL_CONFIGS.items():
-        logger.info(f"Registering model: {model_id}")
-        await ModelFactory.get_model(model_id)
+    if AUTO_CREATE_TABLES:
+        async with async_engine.begin() as connection:
+            await connection.run_sync(create_tables)
+
+    # Resolve the default user once; websocket handlers read it from app.state
+    # instead of querying on every connection
+    async with get_async_db_context() as db:
+        app.state.default_user_id = await UserService(db).get_default_user_id()
+
+    # Load all models from config concurrently; each load runs in a worker
+    # thread, so startup takes about as long as the slowest model
+    model_ids = list(MODEL_CONFIGS)
+    results = await asyncio.gather(
+        *(ModelFactory.get_model(model_id) for model_id in model_ids),
+        return_exceptions=True,
+    )
+    failures = []
+    for model_id, result in zip(model_ids, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to load model %s: %s", model_id, result)
+            failures.append(result)
+        else:
+            logger.info("Loaded model: %s", model_id)
+    # Every load has finished by now; fail startup as before
+    if failures:
+        raise failures[0]
+
+    if WARMUP:
+        # One model at a time so the warm-ups don't compete for the CPU/GPU;
+        # a failed warm-up is logged but doesn't block startup
+        for model_id in model_ids:
+            try:
+                await ModelFactory.warm_up(model_id)
+            except Exception as e:
+                logger.warning("Warm-up failed for model %s: %s", model_id, e)
 
     yield
 
     # Clean up
-    for model_id in MODEL_CONFIGS.keys():
-        await ModelFactory.unload_model(model_id)
+    await asyncio.gather(
+        *(ModelFactory.unload_model(model_id) for model_id in MODEL_CONFIGS)
+    )
 
 
-app = FastAPI(title="AI Chat System", lifespan=lifespan)
+app = FastAPI(
+    title="AI Chat System", lifespan=lifespan, default_response_class=ORJSONResponse
+)
 
 # CORS middleware setup
 app.add_middleware(
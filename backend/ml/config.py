@@ -1,5 +1,6 @@
 import os
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
 # Get base models directory from environment variable with fallback paths
 BASE_MODELS_DIR = os.environ.get(
@@ -9,7 +10,17 @@ BASE_MODELS_DIR = os.environ.get(
     ),
 )
 
-MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
+# Inference dtype for the custom GPT: "float32", "bfloat16" or "float16".
+# Reduced precision only applies on CUDA (and bfloat16 autocast on CPU),
+# so CPU-only boxes keep the float32 default.
+MODEL_DTYPE = os.environ.get("MODEL_DTYPE", "float32")
+
+# Compile the forward pass of the text models with torch.compile. Off by
+# default: compiling adds to startup time, and the graphs are built during
+# the startup warm-up (WARMUP=1) rather than on the first request.
+TORCH_COMPILE = os.environ.get("TORCH_COMPILE", "0") == "1"
+
+_MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "mygpt": {
         "type": "custom_gpt",
         "model_name": os.path.join(
@@ -60,6 +71,27 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     },
 }
 
+
+def freeze_model_config(model_id: str, config: Dict[str, Any]) -> Mapping[str, Any]:
+    """Read-only copy of a model configuration with its derived flags"""
+    return MappingProxyType(
+        {
+            **config,
+            # Gemma's chat template needs alternating user/assistant roles
+            "is_gemma": model_id.startswith("gemma"),
+            "is_vision": config.get("type") == "vision_huggingface"
+            or config.get("supports_vision", False),
+        }
+    )
+
+
+MODEL_CONFIGS: Mapping[str, Mapping[str, Any]] = MappingProxyType(
+    {
+        model_id: freeze_model_config(model_id, config)
+        for model_id, config in _MODEL_CONFIGS.items()
+    }
+)
+
 # Default parameters for text generation
 DEFAULT_GENERATION_PARAMS: Dict[str, Any] = {
     # "max_new_tokens": 100,
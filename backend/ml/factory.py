@@ -1,30 +1,50 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Mapping, Optional
+import asyncio
 import logging
 from .base import BaseModelInterface, VisionModelInterface
 from .providers.huggingface import HuggingFaceModel
 from .providers.vision_huggingface import VisionHuggingFaceModel
 from .providers.custom_gpt import CustomGPTModel
-from .config import MODEL_CONFIGS
+from .config import MODEL_CONFIGS, freeze_model_config
 
 logger = logging.getLogger(__name__)
 
 
 class ModelFactory:
     _models: Dict[str, BaseModelInterface] = {}
-    _model_configs: Dict[str, dict] = MODEL_CONFIGS
+    # MODEL_CONFIGS is read-only; models registered at runtime go in this copy
+    _model_configs: Dict[str, Mapping[str, Any]] = dict(MODEL_CONFIGS)
+    # One lock per model id, so concurrent callers load a model only once
+    _load_locks: Dict[str, asyncio.Lock] = {}
 
     @classmethod
     def register_model(cls, model_id: str, model_config: dict) -> None:
         """Register a model configuration"""
-        cls._model_configs[model_id] = model_config
-        logger.info(f"Registered model configuration for {model_id}")
+        cls._model_configs[model_id] = freeze_model_config(model_id, model_config)
+        logger.info("Registered model configuration for %s", model_id)
+
+    @classmethod
+    def get_config(cls, model_id: str) -> Mapping[str, Any]:
+        """Return a registered model's configuration"""
+        return cls._model_configs[model_id]
+
+    @classmethod
+    def get_loaded(cls, model_id: str) -> Optional[BaseModelInterface]:
+        """Return the model if it is already loaded, without awaiting"""
+        return cls._models.get(model_id)
 
     @classmethod
     async def get_model(cls, model_id: str) -> BaseModelInterface:
         """Get or create a model instance"""
-        if model_id not in cls._models:
-            if model_id not in cls._model_configs:
-                raise ValueError(f"Model {model_id} not registered")
+        if model_id in cls._models:
+            return cls._models[model_id]
+        if model_id not in cls._model_configs:
+            raise ValueError(f"Model {model_id} not registered")
+
+        lock = cls._load_locks.setdefault(model_id, asyncio.Lock())
+        async with lock:
+            if model_id in cls._models:
+                return cls._models[model_id]
 
             config = cls._model_configs[model_id]
             model_type = config.get("type", "huggingface")
@@ -46,6 +66,30 @@ class ModelFactory:
 
         return cls._models[model_id]
 
+    @classmethod
+    async def warm_up(cls, model_id: str) -> None:
+        """Run a one-token generation so one-time setup costs (tokenizer
+        caches, kernel selection, allocator growth) aren't paid by the first
+        real request"""
+        model = await cls.get_model(model_id)
+        model_type = cls._model_configs[model_id].get("type", "huggingface")
+        if model_type == "vision_huggingface":
+            stream = model.generate_stream("hi", max_new_tokens=1)
+        elif model_type == "custom_gpt":
+            stream = model.generate_stream(
+                [{"role": "user", "content": "hi"}], max_length=1
+            )
+        else:
+            stream = model.generate_stream(
+                [{"role": "user", "content": "hi"}], max_new_tokens=1
+            )
+        try:
+            async for _ in stream:
+                break
+        finally:
+            await stream.aclose()
+        logger.info("Warmed up model %s", model_id)
+
     @classmethod
     async def unload_model(cls, model_id: str) -> None:
         """Unload a model from memory"""
@@ -58,7 +102,7 @@ class ModelFactory:
             if hasattr(model, "processor"):
                 del model.processor
             del cls._models[model_id]
-            logger.info(f"Unloaded model {model_id}")
+            logger.info("Unloaded model %s", model_id)
 
     @classmethod
     def get_available_models(cls) -> List[Dict[str, Any]]:
@@ -78,6 +122,5 @@ class ModelFactory:
             model = cls._models[model_id]
             return isinstance(model, VisionModelInterface) and model.supports_vision
         elif model_id in cls._model_configs:
-            config = cls._model_configs[model_id]
-            return config.get("type") == "vision_huggingface"
+            return cls._model_configs[model_id]["is_vision"]
         return False
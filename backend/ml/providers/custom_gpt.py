@@ -1,7 +1,11 @@
+import asyncio
+import logging
 from typing import AsyncGenerator, Dict, Any, List
 
 from ..base import BaseModelInterface
-from ...my_ml.model_interface import ModelInterface
+from ...my_ml.model_interface import get_model_interface
+
+logger = logging.getLogger(__name__)
 
 
 def format_input(prompt):
@@ -22,8 +26,11 @@ class CustomGPTModel(BaseModelInterface):
 
     async def load_model(self) -> None:
         if not self.model_interface:
-            self.model_interface = ModelInterface(self.model_name)
-            # Model is loaded in the constructor of ModelInterface
+            # Weights are loaded once per process and shared with LLMService;
+            # the load itself runs off the event loop
+            self.model_interface = await asyncio.to_thread(
+                get_model_interface, self.model_name
+            )
 
     async def generate_stream(
         self, prompt: List[Dict[str, Any]], **params: Dict[str, Any]
@@ -37,7 +44,12 @@ class CustomGPTModel(BaseModelInterface):
 
         # Convert user/assistant messages to the format expected by the model
         formatted_prompt = format_input(single_prompt)
-        print("Custom GPT Prompt: ", formatted_prompt)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Custom GPT prompt (len=%d): %s",
+                len(formatted_prompt),
+                formatted_prompt[:200],
+            )
         async for token in self.model_interface.generate_stream(
             formatted_prompt,
             max_length=params.get("max_length", 100),
@@ -58,7 +70,7 @@ class CustomGPTModel(BaseModelInterface):
         return {
             "name": self.model_name,
             "type": "custom_gpt",
-            "config": self.config,
+            "config": dict(self.config),
             "loaded": self.model_interface is not None,
             "device": str(self.model_interface.device)
             if self.model_interface
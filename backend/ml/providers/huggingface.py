@@ -1,13 +1,31 @@
+import asyncio
 from typing import AsyncGenerator, Dict, Any
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer
-from threading import Thread
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    AsyncTextIteratorStreamer,
+    StoppingCriteria,
+    StoppingCriteriaList,
+)
+from threading import Event, Thread
 import logging
 from ..base import BaseModelInterface
+from ..config import TORCH_COMPILE
 
 logger = logging.getLogger(__name__)
 
 
+class StopEventCriteria(StoppingCriteria):
+    """Stop generate() once the consumer of the stream has gone away"""
+
+    def __init__(self, stop_event: Event):
+        self.stop_event = stop_event
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.stop_event.is_set()
+
+
 class HuggingFaceModel(BaseModelInterface):
     def __init__(self, model_name: str, model_config: Dict[str, Any]):
         self.model_name = model_name
@@ -17,12 +35,18 @@ class HuggingFaceModel(BaseModelInterface):
         self._device = None
 
     async def load_model(self) -> None:
+        # Loading blocks on disk and network; run it off the event loop so
+        # several models can load at once
+        await asyncio.to_thread(self._load_model)
+
+    def _load_model(self) -> None:
         self.device = "cpu"  # "mps" if torch.backends.mps.is_available() else "cpu"
         try:
-            logger.info(f"Loading model {self.model_name}")
+            logger.info("Loading model %s", self.model_name)
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
 
-            model_kwargs = self.config.get("model_kwargs", {})
+            # Copied, the shared model configuration is read-only
+            model_kwargs = dict(self.config.get("model_kwargs", {}))
             if "torch_dtype" in model_kwargs and model_kwargs["torch_dtype"] == "auto":
                 model_kwargs["torch_dtype"] = (
                     torch.float16 if torch.cuda.is_available() else torch.float32
@@ -31,14 +55,19 @@ class HuggingFaceModel(BaseModelInterface):
             self.model = AutoModelForCausalLM.from_pretrained(
                 self.model_name, **model_kwargs
             ).to(self.device)
+            if TORCH_COMPILE:
+                # dynamic=True so new prompt lengths don't trigger recompiles
+                self.model.forward = torch.compile(self.model.forward, dynamic=True)
 
             self._device = next(self.model.parameters()).device
             logger.info(
-                f"Model {self.model_name} loaded successfully on device {self._device}"
+                "Model %s loaded successfully on device %s",
+                self.model_name,
+                self._device,
             )
 
         except Exception as e:
-            logger.error(f"Error loading model {self.model_name}: {str(e)}")
+            logger.error("Error loading model %s: %s", self.model_name, e)
             raise
 
     async def generate_stream(
@@ -47,6 +76,7 @@ class HuggingFaceModel(BaseModelInterface):
         if not self.model or not self.tokenizer:
             await self.load_model()
 
+        stop_event = Event()
         try:
             formatted_prompt = self.tokenizer.apply_chat_template(
                 # [{"role": "user", "content": prompt}]
@@ -54,14 +84,19 @@ class HuggingFaceModel(BaseModelInterface):
                 tokenize=False,
                 add_generation_prompt=True,
             )
-            print(formatted_prompt)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Formatted prompt (len=%d): %s",
+                    len(formatted_prompt),
+                    formatted_prompt[:200],
+                )
             # Create input tokens
             inputs = self.tokenizer([formatted_prompt], return_tensors="pt").to(
                 self._device
             )
 
             # Initialize the streamer
-            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True)
+            streamer = AsyncTextIteratorStreamer(self.tokenizer, skip_prompt=True)
 
             # Prepare generation parameters
             generation_kwargs = {
@@ -69,25 +104,33 @@ class HuggingFaceModel(BaseModelInterface):
                 **params,  # User-provided parameters
                 **inputs,  # Input tokens
                 "streamer": streamer,  # Add the streamer
+                "stopping_criteria": StoppingCriteriaList(
+                    [StopEventCriteria(stop_event)]
+                ),
             }
 
             # Run generation in a separate thread
             thread = Thread(target=self.model.generate, kwargs=generation_kwargs)
             thread.start()
 
-            # Stream the generated tokens
-            for new_text in streamer:
+            # Stream the generated tokens; the async streamer is fed from the
+            # generation thread, so waiting for text doesn't block the event loop
+            async for new_text in streamer:
                 if new_text.endswith(self.tokenizer.eos_token):
                     yield new_text.rstrip(self.tokenizer.eos_token)
                     break
                 yield new_text
 
-            # Wait for the thread to complete
-            thread.join()
+            # Wait for the thread to complete without blocking the event loop
+            await asyncio.to_thread(thread.join)
 
         except Exception as e:
-            logger.error(f"Error during generation: {str(e)}")
+            logger.error("Error during generation: %s", e)
             raise
+        finally:
+            # Ends the generation thread early if the stream was closed (e.g.
+            # stopped or disconnected client) instead of running to max tokens
+            stop_event.set()
 
     async def tokenize(self, text: str) -> list:
         if not self.tokenizer:
@@ -95,7 +138,7 @@ class HuggingFaceModel(BaseModelInterface):
         try:
             return self.tokenizer.encode(text)
         except Exception as e:
-            logger.error(f"Error during tokenization: {str(e)}")
+            logger.error("Error during tokenization: %s", e)
             raise
 
     @property
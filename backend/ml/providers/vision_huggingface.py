@@ -1,11 +1,17 @@
-from typing import AsyncGenerator, Dict, Any, Optional
+import asyncio
+from typing import AsyncGenerator, Dict, Any
 import torch
-from transformers import AutoProcessor, AutoModelForVision2Seq, TextIteratorStreamer
-from threading import Thread
+from transformers import (
+    AutoProcessor,
+    AutoModelForVision2Seq,
+    AsyncTextIteratorStreamer,
+    StoppingCriteriaList,
+)
+from threading import Event, Thread
 import logging
-import os
 from PIL import Image
 from ..base import VisionModelInterface
+from .huggingface import StopEventCriteria
 
 logger = logging.getLogger(__name__)
 
@@ -19,15 +25,21 @@ class VisionHuggingFaceModel(VisionModelInterface):
         self._device = None
 
     async def load_model(self) -> None:
+        # Loading blocks on disk and network; run it off the event loop so
+        # several models can load at once
+        await asyncio.to_thread(self._load_model)
+
+    def _load_model(self) -> None:
         # self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.device = "cpu"
         try:
-            logger.info(f"Loading vision model {self.model_name}")
+            logger.info("Loading vision model %s", self.model_name)
 
             # For vision models, we use AutoProcessor instead of just a tokenizer
             self.processor = AutoProcessor.from_pretrained(self.model_name)
 
-            model_kwargs = self.config.get("model_kwargs", {})
+            # Copied, the shared model configuration is read-only
+            model_kwargs = dict(self.config.get("model_kwargs", {}))
             if "torch_dtype" in model_kwargs and model_kwargs["torch_dtype"] == "auto":
                 model_kwargs["torch_dtype"] = (
                     torch.float16 if torch.cuda.is_available() else torch.float32
@@ -42,11 +54,13 @@ class VisionHuggingFaceModel(VisionModelInterface):
 
             self._device = next(self.model.parameters()).device
             logger.info(
-                f"Vision model {self.model_name} loaded successfully on device {self._device}"
+                "Vision model %s loaded successfully on device %s",
+                self.model_name,
+                self._device,
             )
 
         except Exception as e:
-            logger.error(f"Error loading vision model {self.model_name}: {str(e)}")
+            logger.error("Error loading vision model %s: %s", self.model_name, e)
             raise
 
     async def generate_stream(
@@ -55,6 +69,7 @@ class VisionHuggingFaceModel(VisionModelInterface):
         if not self.model or not self.processor:
             await self.load_model()
 
+        stop_event = Event()
         try:
             # Create a message without images
             messages = [
@@ -72,7 +87,9 @@ class VisionHuggingFaceModel(VisionModelInterface):
             ).to(self._device)
 
             # Initialize the streamer
-            streamer = TextIteratorStreamer(self.processor.tokenizer, skip_prompt=True)
+            streamer = AsyncTextIteratorStreamer(
+                self.processor.tokenizer, skip_prompt=True
+            )
 
             # Prepare generation parameters
             generation_kwargs = {
@@ -80,14 +97,18 @@ class VisionHuggingFaceModel(VisionModelInterface):
                 **params,  # User-provided parameters
                 **inputs,  # Input tokens
                 "streamer": streamer,  # Add the streamer
+                "stopping_criteria": StoppingCriteriaList(
+                    [StopEventCriteria(stop_event)]
+                ),
             }
 
             # Run generation in a separate thread
             thread = Thread(target=self.model.generate, kwargs=generation_kwargs)
             thread.start()
 
-            # Stream the generated tokens
-            for new_text in streamer:
+            # Stream the generated tokens; the async streamer is fed from the
+            # generation thread, so waiting for text doesn't block the event loop
+            async for new_text in streamer:
                 if self.processor.tokenizer.eos_token and new_text.endswith(
                     self.processor.tokenizer.eos_token
                 ):
@@ -95,66 +116,79 @@ class VisionHuggingFaceModel(VisionModelInterface):
                     break
                 yield new_text
 
-            # Wait for the thread to complete
-            thread.join()
+            # Wait for the thread to complete without blocking the event loop
+            await asyncio.to_thread(thread.join)
 
         except Exception as e:
-            logger.error(f"Error during text generation: {str(e)}")
+            logger.error("Error during text generation: %s", e)
             raise
+        finally:
+            # Ends the generation thread early if the stream was closed
+            stop_event.set()
 
     def _resize_image(
         self, image: Image.Image, size: tuple = (256, 256)
     ) -> Image.Image:
         """Resize image to the specified dimensions"""
-        logger.info(f"Resizing image from {image.size} to {size}")
+        logger.debug("Resizing image from %s to %s", image.size, size)
         return image.resize(size, Image.LANCZOS)
 
+    def _load_image(self, image_path: str) -> Image.Image:
+        """Decode and resize the image to 256x256; runs in a worker thread"""
+        original_image = Image.open(image_path).convert("RGB")
+        logger.debug(
+            "Image loaded from %s with original size %s",
+            image_path,
+            original_image.size,
+        )
+        image = self._resize_image(original_image, (256, 256))
+        logger.debug("Image resized to 256x256")
+        return image
+
+    def _prepare_inputs(self, prompt: str, image_path: str):
+        """Build the model inputs for a prompt and image; runs in a worker thread"""
+        image = self._load_image(image_path)
+
+        # Create messages with image
+        messages = [
+            {
+                "role": "user",
+                "content": [{"type": "image"}, {"type": "text", "text": prompt}],
+            },
+        ]
+
+        # Format the prompt for the model
+        formatted_prompt = self.processor.apply_chat_template(
+            messages,
+            add_generation_prompt=True,  # tokenize=False
+        )
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Formatted prompt: %s...", formatted_prompt[:100])
+
+        # Create inputs with image
+        return self.processor(
+            text=formatted_prompt,
+            images=[image],
+            return_tensors="pt",  # padding=True
+        ).to(self._device)
+
     async def generate_stream_with_image(
         self, prompt: str, image_path: str, **params: Dict[str, Any]
     ) -> AsyncGenerator[str, None]:
         if not self.model or not self.processor:
             await self.load_model()
 
+        stop_event = Event()
         try:
-            # Load the image
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-
-            # Load and resize the image to 256x256
-            original_image = Image.open(image_path).convert("RGB")
-            logger.info(
-                f"Image loaded from {image_path} with original size {original_image.size}"
-            )
-
-            # Resize the image to 256x256
-            image = self._resize_image(original_image, (256, 256))
-            logger.info(f"Image resized to 256x256")
-
-            # Create messages with image
-            messages = [
-                {
-                    "role": "user",
-                    "content": [{"type": "image"}, {"type": "text", "text": prompt}],
-                },
-            ]
-
-            # Format the prompt for the model
-            formatted_prompt = self.processor.apply_chat_template(
-                messages,
-                add_generation_prompt=True,  # tokenize=False
-            )
-
-            logger.info(f"Formatted prompt: {formatted_prompt[:100]}...")
-
-            # Create inputs with image
-            inputs = self.processor(
-                text=formatted_prompt,
-                images=[image],
-                return_tensors="pt",  # padding=True
-            ).to(self._device)
+            # Image decoding and preprocessing are CPU heavy, so they run in
+            # a worker thread instead of alongside the websocket I/O; the path
+            # was already validated by the caller and a missing file still
+            # raises FileNotFoundError from Image.open
+            inputs = await asyncio.to_thread(self._prepare_inputs, prompt, image_path)
 
             # Initialize the streamer
-            streamer = TextIteratorStreamer(
+            streamer = AsyncTextIteratorStreamer(
                 self.processor, skip_prompt=True, skip_special_tokens=True
             )
 
@@ -164,18 +198,23 @@ class VisionHuggingFaceModel(VisionModelInterface):
                 **params,  # User-provided parameters
                 **inputs,  # Input tokens and image
                 "streamer": streamer,  # Add the streamer
+                "stopping_criteria": StoppingCriteriaList(
+                    [StopEventCriteria(stop_event)]
+                ),
             }
 
             logger.info(
-                f"Starting generation with parameters: {self.config.get('generation_params', {})}"
+                "Starting generation with parameters: %s",
+                self.config.get("generation_params", {}),
             )
 
             # Run generation in a separate thread
             thread = Thread(target=self.model.generate, kwargs=generation_kwargs)
             thread.start()
 
-            # Stream the generated tokens
-            for new_text in streamer:
+            # Stream the generated tokens; the async streamer is fed from the
+            # generation thread, so waiting for text doesn't block the event loop
+            async for new_text in streamer:
                 # if self.processor.tokenizer.eos_token and new_text.endswith(
                 #     self.processor.tokenizer.eos_token
                 # ):
@@ -183,12 +222,15 @@ class VisionHuggingFaceModel(VisionModelInterface):
                 #     break
                 yield new_text
 
-            # Wait for the thread to complete
-            thread.join()
+            # Wait for the thread to complete without blocking the event loop
+            await asyncio.to_thread(thread.join)
 
         except Exception as e:
-            logger.error(f"Error during vision generation: {str(e)}")
+            logger.error("Error during vision generation: %s", e)
             raise
+        finally:
+            # Ends the generation thread early if the stream was closed
+            stop_event.set()
 
     async def tokenize(self, text: str) -> list:
         if not self.processor:
@@ -196,7 +238,7 @@ class VisionHuggingFaceModel(VisionModelInterface):
         try:
             return self.processor.tokenizer.encode(text)
         except Exception as e:
-            logger.error(f"Error during tokenization: {str(e)}")
+            logger.error("Error during tokenization: %s", e)
             raise
 
     @property
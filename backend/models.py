@@ -1,10 +1,15 @@
-from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, func
 from sqlalchemy.orm import relationship, DeclarativeBase
 
 
 class Base(DeclarativeBase):
-    pass
+    # Timestamps are generated by the database; fetch them back with the
+    # INSERT (RETURNING) so created_at is readable right after a flush. The
+    # INSERT also sends now() itself, so databases created before the
+    # server default existed still get a timestamp. SQLite's now() has
+    # one-second resolution, so every ordering on created_at also breaks
+    # ties on id
+    __mapper_args__ = {"eager_defaults": True}
 
 
 class User(Base):
@@ -12,31 +17,54 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(80), unique=True, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime(timezone=True),
+        default=func.now(),
+        server_default=func.now(),
+        nullable=False,
+    )
     conversations = relationship("Conversation", back_populates="user")
 
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (Index("ix_conv_user_created", "user_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime(timezone=True),
+        default=func.now(),
+        server_default=func.now(),
+        nullable=False,
+    )
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     user = relationship("User", back_populates="conversations")
     messages = relationship(
-        "Message", back_populates="conversation", cascade="all, delete-orphan"
+        "Message",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        # created_at has one-second resolution, so break ties by insert order
+        order_by="[Message.created_at, Message.id]",
     )
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conv_created", "conversation_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     role = Column(String(50), nullable=False)  # 'user' or 'assistant'
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime(timezone=True),
+        default=func.now(),
+        server_default=func.now(),
+        nullable=False,
+    )
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
     image_url = Column(
         String(500), nullable=True
@@ -1,16 +1,24 @@
+import asyncio
+import contextlib
+import threading
 import time
 import logging
 import os
-from typing import AsyncGenerator, Dict, Any
+from functools import lru_cache
+from typing import AsyncGenerator, Dict, Any, Iterator, Optional
 
 import torch
 import tiktoken
 from modelling.model import GPTModel
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from ..ml.config import MODEL_DTYPE, TORCH_COMPILE
+
 logger = logging.getLogger(__name__)
 
+# Keep the transformer blocks in host memory and stream them to the GPU
+# one block ahead of the forward pass (for checkpoints that don't fit on-device)
+CPU_OFFLOAD = os.environ.get("MODEL_CPU_OFFLOAD", "0") == "1"
+
 
 def text_to_token_ids(text, tokenizer):
     encoded = tokenizer.encode(text)
@@ -23,16 +31,90 @@ def token_ids_to_text(token_ids, tokenizer):
     return tokenizer.decode(flat.tolist())
 
 
+# Marks the end of a token stream handed over from the worker thread
+_STREAM_END = object()
+
+
+class _LayerPrefetcher:
+    """Stream offloaded transformer blocks to the GPU on a dedicated copy stream.
+
+    While block ``i`` runs on the default stream, block ``i + 1`` is copied
+    from pinned host memory on ``copy_stream``, so the host-to-device transfer
+    overlaps with compute. The device copy of a block is dropped after its
+    forward pass.
+    """
+
+    def __init__(self, blocks: torch.nn.Sequential, device: torch.device):
+        self.device = device
+        self.copy_stream = torch.cuda.Stream(device=device)
+        self.blocks = list(blocks)
+        self.tensors = [
+            list(block.parameters()) + list(block.buffers()) for block in self.blocks
+        ]
+        for tensors in self.tensors:
+            for tensor in tensors:
+                tensor.data = tensor.data.pin_memory()
+        self.host_data = [[t.data for t in tensors] for tensors in self.tensors]
+        self.prefetched = set()
+
+        for i, block in enumerate(self.blocks):
+            block.register_forward_pre_hook(self._make_pre_hook(i))
+            block.register_forward_hook(self._make_post_hook(i))
+
+    def _prefetch(self, i: int) -> None:
+        with torch.inference_mode(False), torch.cuda.stream(self.copy_stream):
+            for tensor, host in zip(self.tensors[i], self.host_data[i]):
+                tensor.data = host.to(self.device, non_blocking=True)
+        self.prefetched.add(i)
+
+    def _make_pre_hook(self, i: int):
+        def hook(module, args):
+            if i not in self.prefetched:
+                self._prefetch(i)
+            current_stream = torch.cuda.current_stream(self.device)
+            current_stream.wait_stream(self.copy_stream)
+            for tensor in self.tensors[i]:
+                tensor.data.record_stream(current_stream)
+            if i + 1 < len(self.blocks):
+                self._prefetch(i + 1)
+
+        return hook
+
+    def _make_post_hook(self, i: int):
+        def hook(module, args, output):
+            for tensor, host in zip(self.tensors[i], self.host_data[i]):
+                tensor.data = host
+            self.prefetched.discard(i)
+
+        return hook
+
+
+def _select_device() -> torch.device:
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+
 class ModelInterface:
     def __init__(self, model_filename: str):
         """Initialize the model interface and load the model"""
         logger.info("Initializing model interface")
-        # self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model_filename = model_filename
-        self.device = torch.device(
-            "mps" if torch.backends.mps.is_available() else "cpu"
-        )
-        logger.info(f"Using device: {self.device}")
+        self.device = _select_device()
+        logger.info("Using device: %s", self.device)
+
+        self.dtype = getattr(torch, MODEL_DTYPE)
+        if self.device.type == "cpu" and self.dtype == torch.float16:
+            # CPU autocast only supports bfloat16
+            self.dtype = torch.float32
+        logger.info("Using dtype: %s", self.dtype)
+
+        # Allow TF32 tensor cores for the float32 matmuls of the forward pass
+        torch.set_float32_matmul_precision("high")
+        if self.device.type == "cuda":
+            torch.backends.cuda.matmul.allow_tf32 = True
 
         # Load model - this will be done once at startup
         self._load_model()
@@ -76,7 +158,7 @@ class ModelInterface:
                     # Last resort - just use the filename and hope it's in the current directory
                     model_path = self.model_filename
 
-            logger.info(f"Loading model from: {model_path}")
+            logger.info("Loading model from: %s", model_path)
 
             self.model = GPTModel(self.BASE_CONFIG)
             self.model.load_state_dict(
@@ -84,47 +166,50 @@ class ModelInterface:
                     model_path, weights_only=True, map_location=torch.device("cpu")
                 )
             )
-            self.model = self.model.eval()
-
-            # Check if Apple Silicon MPS is available
-            if torch.backends.mps.is_available():
-                logger.info("Using Apple Silicon MPS for acceleration")
-                self.model.to("mps")
+            if self.device.type == "cuda" and self.dtype != torch.float32:
+                self.model = self.model.to(dtype=self.dtype)
+
+            if CPU_OFFLOAD and self.device.type == "cuda":
+                logger.info("Offloading transformer blocks to pinned host memory")
+                for name, module in self.model.named_children():
+                    if name != "trf_blocks":
+                        module.to(self.device)
+                self._layer_prefetcher = _LayerPrefetcher(
+                    self.model.trf_blocks, self.device
+                )
+                self.model = self.model.eval()
             else:
-                logger.info(f"MPS not available, using {self.device}")
-                self.model.to(self.device)
+                self.model = self.model.to(self.device).eval()
+                if TORCH_COMPILE:
+                    # The sequence grows every step, so compile for dynamic shapes
+                    self.model.forward = torch.compile(
+                        self.model.forward, dynamic=True
+                    )
 
             load_time = time.time() - start_time
-            logger.info(f"Model loaded successfully in {load_time:.2f} seconds")
+            logger.info("Model loaded successfully in %.2f seconds", load_time)
         except Exception as e:
-            logger.error(f"Failed to load model: {str(e)}")
+            logger.error("Failed to load model: %s", e)
             self.model = None
             self.tokenizer = None
             raise
 
-    async def generate_stream(
+    def _autocast(self):
+        """Autocast context for the forward pass at the configured dtype"""
+        if self.dtype == torch.float32 or self.device.type not in ("cuda", "cpu"):
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=self.device.type, dtype=self.dtype)
+
+    def _iter_tokens(
         self,
         prompt: str,
-        max_length: int = 100,
-        temperature: float = 0.7,
-        top_k: int = None,
-        top_p: float = 0.9,
-        eos_id: int = None,
-        **kwargs: Dict[str, Any],
-    ) -> AsyncGenerator[str, None]:
-        """
-        Stream tokens from the model one by one.
-
-        Args:
-            prompt: The input prompt to generate from
-            max_length: Maximum number of tokens to generate
-            temperature: Sampling temperature (higher = more random)
-            top_p: Nucleus sampling parameter
-            kwargs: Additional parameters for the model
-
-        Yields:
-            Generated tokens one by one
-        """
+        max_length: int,
+        temperature: float,
+        top_k: Optional[int],
+        eos_id: Optional[int],
+        stop_event: threading.Event,
+    ) -> Iterator[str]:
+        """Blocking token loop behind ``generate_stream``; runs in a worker thread"""
         if not self.model or not self.tokenizer:
             logger.error("Model or tokenizer not initialized")
             yield "Error: Model not initialized properly."
@@ -133,11 +218,11 @@ class ModelInterface:
         try:
             # Log inference start
             start_time = time.time()
-            logger.info(f"Starting generation with prompt length: {len(prompt)}")
+            logger.info("Starting generation with prompt length: %d", len(prompt))
 
             # Validate input length
             if len(prompt) > 4000:  # Example limit
-                logger.warning(f"Prompt too long: {len(prompt)} chars")
+                logger.warning("Prompt too long: %d chars", len(prompt))
                 yield "Error: Prompt too long. Please reduce length."
                 return
 
@@ -153,10 +238,12 @@ class ModelInterface:
 
             # For-loop is the same as before: Get logits, and only focus on last time step
             for _ in range(max_length):
+                if stop_event.is_set():
+                    break
                 idx_cond = idx[:, -self.BASE_CONFIG["context_length"] :]
-                with torch.no_grad():
+                with torch.inference_mode(), self._autocast():
                     logits = self.model(idx_cond)
-                logits = logits[:, -1, :]
+                logits = logits[:, -1, :].float()
 
                 # New: Filter logits with top_k sampling
                 if top_k is not None:
@@ -217,14 +304,70 @@ class ModelInterface:
             total_time = time.time() - start_time
             token_count = idx.shape[1] - original_length
             logger.info(
-                f"Generation completed: {token_count} tokens in {total_time:.2f}s"
+                "Generation completed: %d tokens in %.2fs", token_count, total_time
             )
-            logger.info(f"Generation speed: {token_count / total_time:.2f} tokens/s")
+            logger.info("Generation speed: %.2f tokens/s", token_count / total_time)
 
         except Exception as e:
-            logger.error(f"Error during generation: {str(e)}")
+            logger.error("Error during generation: %s", e)
             yield f"Error during generation: {str(e)}"
 
+    async def generate_stream(
+        self,
+        prompt: str,
+        max_length: int = 100,
+        temperature: float = 0.7,
+        top_k: int = None,
+        top_p: float = 0.9,
+        eos_id: int = None,
+        **kwargs: Dict[str, Any],
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream generated text from the model.
+
+        The decoding loop runs in a worker thread so the event loop stays free
+        while the model computes. Tokens are handed over through a queue, and
+        everything produced since the previous step is yielded as one chunk.
+
+        Args:
+            prompt: The input prompt to generate from
+            max_length: Maximum number of tokens to generate
+            temperature: Sampling temperature (higher = more random)
+            top_p: Nucleus sampling parameter
+            kwargs: Additional parameters for the model
+
+        Yields:
+            Generated text chunks
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop_event = threading.Event()
+
+        def produce() -> None:
+            try:
+                for token in self._iter_tokens(
+                    prompt, max_length, temperature, top_k, eos_id, stop_event
+                ):
+                    loop.call_soon_threadsafe(queue.put_nowait, token)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+
+        loop.run_in_executor(None, produce)
+        try:
+            finished = False
+            while not finished:
+                chunk = [await queue.get()]
+                while not queue.empty():
+                    chunk.append(queue.get_nowait())
+                if chunk[-1] is _STREAM_END:
+                    chunk.pop()
+                    finished = True
+                if chunk:
+                    yield "".join(chunk)
+        finally:
+            # Stops the worker when the consumer goes away mid-stream
+            stop_event.set()
+
     async def generate(
         self,
         prompt: str,
@@ -252,3 +395,13 @@ class ModelInterface:
                 return token
             result.append(token)
         return "".join(result)
+
+
+@lru_cache(maxsize=None)
+def get_model_interface(model_filename: str) -> ModelInterface:
+    """Get the process-wide model interface for a checkpoint.
+
+    The weights are loaded on the first call and shared by every caller
+    afterwards, so the model is never loaded twice.
+    """
+    return ModelInterface(model_filename)
@@ -1,41 +1,50 @@
 from typing import Generic, TypeVar, Type, Union, List
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import Base
+from ..database import IN_TRANSACTION
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
 class BaseRepository(Generic[ModelType]):
-    def __init__(self, model: Type[ModelType], db: Session):
+    def __init__(self, model: Type[ModelType], db: AsyncSession):
         self.model = model
         self.db = db
 
-    def get(self, id: int) -> Union[ModelType, None]:
-        return self.db.query(self.model).filter(self.model.id == id).first()
+    async def _commit(self) -> None:
+        """Commit, or only flush when inside a transactional() block"""
+        if self.db.info.get(IN_TRANSACTION):
+            await self.db.flush()
+        else:
+            await self.db.commit()
 
-    def get_all(self) -> List[ModelType]:
-        return self.db.query(self.model).all()
+    async def get(self, id: int) -> Union[ModelType, None]:
+        return await self.db.scalar(select(self.model).where(self.model.id == id))
 
-    def create(self, **kwargs) -> ModelType:
+    async def get_all(self) -> List[ModelType]:
+        return list(await self.db.scalars(select(self.model)))
+
+    async def create(self, **kwargs) -> ModelType:
         db_obj = self.model(**kwargs)
         self.db.add(db_obj)
-        self.db.commit()
-        self.db.refresh(db_obj)
+        # id and server defaults come back from the INSERT (eager_defaults) and
+        # the session doesn't expire on commit, so no refresh SELECT is needed
+        await self._commit()
         return db_obj
 
-    def update(self, id: int, **kwargs) -> Union[ModelType, None]:
-        db_obj = self.get(id)
+    async def update(self, id: int, **kwargs) -> Union[ModelType, None]:
+        db_obj = await self.get(id)
         if db_obj:
             for key, value in kwargs.items():
                 setattr(db_obj, key, value)
-            self.db.commit()
-            self.db.refresh(db_obj)
+            await self._commit()
         return db_obj
 
-    def delete(self, id: int) -> bool:
-        db_obj = self.get(id)
+    async def delete(self, id: int) -> bool:
+        db_obj = await self.get(id)
         if db_obj:
-            self.db.delete(db_obj)
-            self.db.commit()
+            await self.db.delete(db_obj)
+            await self._commit()
             return True
         return False
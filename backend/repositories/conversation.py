@@ -1,31 +1,49 @@
-from sqlalchemy.orm import Session
-from typing import List, Tuple, Union
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Tuple, Union
 from .base import BaseRepository
 from ..models import Conversation, Message
 
 
 class ConversationRepository(BaseRepository[Conversation]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(Conversation, db)
 
-    def get_user_conversations(
+    async def get_user_conversations(
         self, user_id: int
-    ) -> List[Tuple[Conversation, Message]]:
-        """Get all conversations for a user with their latest messages"""
-        return (
-            self.db.query(Conversation, Message)
-            .filter(Conversation.user_id == user_id)
-            .outerjoin(Message, Message.conversation_id == Conversation.id)
-            .order_by(Conversation.created_at.desc(), Message.created_at.desc())
-            .all()
+    ) -> List[Tuple[Conversation, Optional[str]]]:
+        """Get all conversations for a user with their latest message content"""
+        latest = select(
+            Message.conversation_id,
+            Message.content,
+            func.row_number()
+            .over(
+                partition_by=Message.conversation_id,
+                order_by=(Message.created_at.desc(), Message.id.desc()),
+            )
+            .label("rn"),
+        ).subquery()
+        result = await self.db.execute(
+            select(Conversation, latest.c.content)
+            .outerjoin(
+                latest,
+                and_(latest.c.conversation_id == Conversation.id, latest.c.rn == 1),
+            )
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.created_at.desc(), Conversation.id.desc())
         )
+        return result.all()
 
-    def get_conversation_with_messages(
+    async def get_conversation_with_messages(
         self, conversation_id: int
     ) -> Union[Conversation, None]:
-        """Get a conversation with all its messages"""
-        return (
-            self.db.query(Conversation)
-            .filter(Conversation.id == conversation_id)
-            .first()
+        """Get a conversation with all its messages loaded in a single round-trip"""
+        return await self.db.scalar(
+            select(Conversation)
+            .options(selectinload(Conversation.messages))
+            .where(Conversation.id == conversation_id)
+            # Sessions can outlive a single request (e.g. websockets), so make
+            # sure an already loaded conversation picks up new messages
+            .execution_options(populate_existing=True)
         )
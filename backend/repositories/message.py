@@ -1,28 +1,60 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Union
+from sqlalchemy import Row, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Sequence, Tuple, Union
 from .base import BaseRepository
 from ..models import Message
 
 
 class MessageRepository(BaseRepository[Message]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(Message, db)
 
-    def get_conversation_messages(self, conversation_id: int) -> List[Message]:
+    async def get_conversation_messages(self, conversation_id: int) -> List[Message]:
         """Get all messages for a conversation ordered by creation time"""
-        return (
-            self.db.query(Message)
-            .filter(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at.asc())
-            .all()
+        result = await self.db.scalars(
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.asc(), Message.id.asc())
         )
+        return list(result)
 
-    def get_latest_message(self, conversation_id: int) -> Union[Message, None]:
+    async def get_conversation_message_rows(
+        self, conversation_id: int
+    ) -> Sequence[Row]:
+        """Get the columns needed to render a conversation, without ORM objects"""
+        result = await self.db.execute(
+            select(
+                Message.id,
+                Message.content,
+                Message.role,
+                Message.created_at,
+                Message.image_url,
+            )
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.asc(), Message.id.asc())
+        )
+        return result.all()
+
+    async def get_conversation_history(
+        self, conversation_id: int
+    ) -> List[Tuple[str, str]]:
+        """Get the (role, content) pairs of a conversation, oldest first"""
+        result = await self.db.execute(
+            select(Message.role, Message.content)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.asc(), Message.id.asc())
+        )
+        return [tuple(row) for row in result]
+
+    async def get_latest_message(self, conversation_id: int) -> Union[Message, None]:
         """Get the latest message in a conversation"""
-        return (
-            self.db.query(Message)
-            .filter(Message.conversation_id == conversation_id)
-            .order_by(desc(Message.created_at))
-            .first()
+        # The inner query is answered from ix_messages_conv_created alone
+        # (the index carries the rowid); only the winning row is then read
+        latest_id = (
+            select(Message.id)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(desc(Message.created_at), desc(Message.id))
+            .limit(1)
+            .scalar_subquery()
         )
+        return await self.db.scalar(select(Message).where(Message.id == latest_id))
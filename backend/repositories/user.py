@@ -1,18 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Union
 from .base import BaseRepository
 from ..models import User
 
 
 class UserRepository(BaseRepository[User]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(User, db)
 
-    def get_by_username(self, username: str) -> Union[User, None]:
-        return self.db.query(User).filter(User.username == username).first()
+    async def get_by_username(self, username: str) -> Union[User, None]:
+        return await self.db.scalar(select(User).where(User.username == username))
 
-    def get_or_create_default_user(self) -> User:
-        user = self.get_by_username("default_user")
+    async def get_or_create_default_user(self) -> User:
+        user = await self.get_by_username("default_user")
         if not user:
-            user = self.create(username="default_user")
+            user = await self.create(username="default_user")
         return user
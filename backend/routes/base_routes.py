@@ -1,16 +1,18 @@
 import os
 from typing import Optional
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, Form
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form
 
 from ..schemas import ImageUploadResponse, HealthResponse
-from ..utils.image_utils import save_uploaded_image
-from ..database import get_db_context
+from ..utils.image_utils import save_uploaded_image_stream
+from ..dependencies import get_conversation_service, get_user_service
 from ..services.user_service import UserService
 from ..services.conversation_service import ConversationService
 
 router = APIRouter(prefix="/api")
 
+_HEALTH_OK = HealthResponse(status="ok")
+
 
 @router.get("/")
 async def root():
@@ -20,51 +22,48 @@ async def root():
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
-    return HealthResponse(status="ok")
+    return _HEALTH_OK
 
 
 @router.post("/upload-image", response_model=ImageUploadResponse)
 async def upload_image(
     file: UploadFile = File(...),
     conversation_id: Optional[int] = Form(None),
-    # db: Session = Depends(get_db_context),
+    user_service: UserService = Depends(get_user_service),
+    conversation_service: ConversationService = Depends(get_conversation_service),
 ):
     """
     Upload an image for use with a vision model
     """
     try:
-        with get_db_context() as db:
-            # Read the file content
-            file_content = await file.read()
-
-            # Process and save the image
-            success, message, file_path = save_uploaded_image(
-                file_content, file.filename
-            )
+        # Stream the upload to disk and validate it
+        success, message, file_path = await save_uploaded_image_stream(
+            file, file.filename
+        )
 
-            if not success:
-                raise HTTPException(status_code=400, detail=message)
+        if not success:
+            raise HTTPException(status_code=400, detail=message)
 
-            # Create the relative URL
-            file_url = os.path.basename(file_path)
+        # Create the relative URL
+        file_url = file_path.rsplit(os.sep, 1)[-1]
 
-            # Get user
-            user_service = UserService(db)
-            user = user_service.get_or_create_default_user()
+        # Get user
+        user_id = await user_service.get_default_user_id()
 
-            # If no conversation_id is provided, create a new vision conversation
-            if not conversation_id:
-                conversation_service = ConversationService(db)
-                conversation = conversation_service.create_conversation(
-                    title="Vision Chat", user_id=user.id
-                )
-                conversation_id = conversation.id
-
-            return ImageUploadResponse(
-                success=True,
-                message="Image uploaded successfully",
-                image_url=file_url,
-                conversation_id=conversation_id,
+        # If no conversation_id is provided, create a new vision conversation
+        if not conversation_id:
+            conversation = await conversation_service.create_conversation(
+                title="Vision Chat", user_id=user_id
             )
+            conversation_id = conversation.id
+
+        return ImageUploadResponse.model_construct(
+            success=True,
+            message="Image uploaded successfully",
+            image_url=file_url,
+            conversation_id=conversation_id,
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
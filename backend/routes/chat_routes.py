@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
 from typing import List
 
 from ..schemas import ConversationResponse
-from ..database import get_db
+from ..dependencies import (
+    get_conversation_service,
+    get_message_service,
+    get_user_service,
+)
 from ..services.message_service import MessageService
 from ..services.conversation_service import ConversationService
 from ..services.user_service import UserService
 
-
 router = APIRouter(
     prefix="/api",
     tags=["chat"],
@@ -17,35 +20,43 @@ router = APIRouter(
 
 
 @router.get("/chat/{chat_id}/messages")
-async def get_chat_messages(chat_id: int, db: Session = Depends(get_db)):
+async def get_chat_messages(
+    chat_id: int, message_service: MessageService = Depends(get_message_service)
+):
     """Get all messages for a specific chat"""
     try:
-        message_service = MessageService(db)
-        messages = message_service.get_conversation_messages(chat_id)
-        return message_service.format_messages_for_response(messages)
+        rows = await message_service.get_conversation_message_rows(chat_id)
+        # Return the response directly to skip jsonable_encoder
+        return ORJSONResponse(message_service.format_messages_for_response(rows))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/conversations", response_model=List[ConversationResponse])
-async def get_conversations(db: Session = Depends(get_db)):
+async def get_conversations(
+    user_service: UserService = Depends(get_user_service),
+    conversation_service: ConversationService = Depends(get_conversation_service),
+):
     """Get all conversations for the current user"""
     try:
-        user_service = UserService(db)
-        conversation_service = ConversationService(db)
-
-        user = user_service.get_or_create_default_user()
-        return conversation_service.get_user_conversations(user.id)
+        user_id = await user_service.get_default_user_id()
+        # Return the response directly to skip response_model validation and
+        # jsonable_encoder; the rows are already in ConversationResponse shape
+        return ORJSONResponse(
+            await conversation_service.get_user_conversations(user_id)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/conversations/{conversation_id}")
-async def delete_conversation(conversation_id: int, db: Session = Depends(get_db)):
+async def delete_conversation(
+    conversation_id: int,
+    conversation_service: ConversationService = Depends(get_conversation_service),
+):
     """Delete a specific conversation"""
     try:
-        conversation_service = ConversationService(db)
-        if conversation_service.delete_conversation(conversation_id):
+        if await conversation_service.delete_conversation(conversation_id):
             return {"status": "success", "message": "Conversation deleted successfully"}
         raise HTTPException(status_code=404, detail="Conversation not found")
     except Exception as e:
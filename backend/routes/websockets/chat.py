@@ -1,66 +1,113 @@
+import asyncio
 import logging
+from typing import Dict, List, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from .connection import manager
-from ...services.llm_service import LLMService
-from ...services.user_service import UserService
 from ...services.conversation_service import ConversationService
 from ...services.message_service import MessageService
-from ...database import get_db_context
+from ...services.response_cache import response_cache
+from ...database import get_async_db_context, transactional
 from ...schemas import WebSocketChatInput
 from ...ml.factory import ModelFactory
-from ...utils.message_utils import fix_gemma_messages
+from ...utils.message_utils import append_message, fix_gemma_messages
+from ...utils.stream_utils import coalesce_tokens, replay_text
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
 
+async def _persist_message(
+    content: str,
+    role: str,
+    conversation_id: int,
+    after: Optional["asyncio.Task[bool]"] = None,
+) -> bool:
+    """Store a message in its own session, off the response path.
+
+    ``after`` is the write of the previous message; it is awaited first so the
+    conversation keeps its order, and nothing is stored if it failed.
+    """
+    if after is not None and not await after:
+        return False
+    try:
+        async with get_async_db_context() as db:
+            await MessageService(db).create_message(
+                content=content, role=role, conversation_id=conversation_id
+            )
+        return True
+    except Exception as e:
+        logger.error("Error storing %s message: %s", role, e)
+        return False
+
+
 @router.websocket("/api/ws/{model_id}")
 async def websocket_chat(websocket: WebSocket, model_id: str):
     """Process the request"""
-    logger.info(f"WebSocket connection established for model: {model_id}")
+    logger.info("WebSocket connection established for model: %s", model_id)
 
     client_id = await manager.connect(websocket)
-    logger.info(f"Client connected with ID: {client_id}")
+    logger.info("Client connected with ID: %s", client_id)
 
     try:
-        model = await ModelFactory.get_model(model_id)
+        # Models are preloaded at startup, so this is normally a dict lookup
+        model = ModelFactory.get_loaded(model_id) or await ModelFactory.get_model(
+            model_id
+        )
     except Exception as e:
-        logger.error(f"Error getting model: {e}")
+        logger.error("Error getting model: %s", e)
         await manager.send_personal_message(client_id, {"error": str(e)})
         return
 
+    # Last background message write, finished before the next message is
+    # stored so the conversation keeps its order
+    persist_task = None
     try:
-        # Use context manager instead of manual DB session management
-        with get_db_context() as db:
-            # chat_service = ChatService(db)
-            user_service = UserService(db)
-            conversation_service = ConversationService(db)
-            message_service = MessageService(db)
-
-            # Get or create default user
-            user = user_service.get_or_create_default_user()
-            stopped = False
-            while True:
-                # data = await manager.receive_message(client_id)
-                data = await websocket.receive_json()
-                command = data.get("command", "")
-
-                if command == "generate":
-                    # Start a new generation
-                    message = WebSocketChatInput(**data)
+        # Default user, resolved once at startup
+        user_id = websocket.app.state.default_user_id
+
+        # Message history of the conversations used on this socket, so later
+        # turns don't re-read the whole history from the database. Entries are
+        # dropped when the conversation is gone or a message failed to store
+        history_cache: Dict[int, List[Dict[str, str]]] = {}
+        # Gemma requires alternating roles, so its history merges repeats
+        merge_roles = ModelFactory.get_config(model_id)["is_gemma"]
+        async for data in manager.iter_messages(client_id):
+            command = data.get("command", "")
+
+            if command == "generate":
+                # Start a new generation
+                message = WebSocketChatInput.model_validate(data)
+
+                if persist_task is not None:
+                    if not await persist_task:
+                        history_cache.pop(persist_conversation_id, None)
+                    persist_task = None
+
+                # Sessions are opened per command rather than for the lifetime
+                # of the socket, so idle clients don't tie up pooled connections.
+                # A new conversation and the user message are committed together
+                async with get_async_db_context() as db, transactional(db):
+                    conversation_service = ConversationService(db)
+                    message_service = MessageService(db)
 
                     # Get or create conversation
+                    history = None
+                    new_conversation = False
                     if message.chat_id:
-                        conversation = conversation_service.get_conversation(
-                            message.chat_id
+                        # Looked up every turn so a conversation deleted
+                        # elsewhere isn't served from the history cache
+                        conversation = await conversation_service.get_conversation(
+                            message.chat_id, with_messages=False
                         )
                         if not conversation:
+                            history_cache.pop(message.chat_id, None)
                             await manager.send_personal_message(
                                 client_id, {"error": "Conversation not found"}
                             )
                             continue
+                        history = history_cache.get(conversation.id)
                     else:
                         # Title summarizer with Qwen
                         title = ""
@@ -82,115 +129,196 @@ async def websocket_chat(websocket: WebSocket, model_id: str):
                         # ):
                         #     title += token
                         title = message.message[:35]
-                        logger.info(f"Generated title: {title}")
+                        logger.info("Generated title: %s", title)
                         # First message, create a new conversation
                         # title = message.message[:35]
-                        conversation = conversation_service.create_conversation(
-                            user.id, title
+                        conversation = await conversation_service.create_conversation(
+                            user_id, title
                         )
+                        new_conversation = True
+                        history = []
 
-                    # Store user message
-                    message_service.create_message(
-                        content=message.message,
-                        role="user",
-                        conversation_id=conversation.id,
-                    )
+                    # Get conversation history for context; only read from the
+                    # database the first time the conversation is used here
+                    if history is None:
+                        history = [
+                            {"role": role, "content": content}
+                            for role, content in await message_service.get_conversation_history(
+                                conversation.id
+                            )
+                        ]
+                        # Fixing the Gemma exception:
+                        # Conversation roles must alternate user/assistant/user/assistant/
+                        # The cached history is kept in this merged form, so
+                        # later turns only merge or append their own message
+                        if merge_roles:
+                            history = fix_gemma_messages(history)
+                    append_message(history, "user", message.message, merge_roles)
+                    history_cache[conversation.id] = history
 
-                    # Get conversation history for context
-                    previous_messages = message_service.get_conversation_messages(
-                        conversation.id
-                    )
+                    # Store user message. A new conversation is committed
+                    # together with it; otherwise nothing downstream needs the
+                    # row, so it is written while the reply generates
+                    if new_conversation:
+                        await message_service.create_message(
+                            content=message.message,
+                            role="user",
+                            conversation_id=conversation.id,
+                        )
+                    else:
+                        persist_task = asyncio.create_task(
+                            _persist_message(message.message, "user", conversation.id)
+                        )
+                        persist_conversation_id = conversation.id
 
-                    # Format the prompt including conversation history
-                    previous_messages = [
-                        {
-                            "role": m.role,
-                            "content": m.content,
-                        }
-                        for m in previous_messages
-                    ]
-                    # Fixing the Gemma exception:
-                    # Conversation roles must alternate user/assistant/user/assistant/
-                    if model_id.startswith("gemma"):
-                        previous_messages = fix_gemma_messages(previous_messages)
-                    logger.info(f"Previous messages:")
-                    print(previous_messages)
-                    logging.info(
-                        f"Model settings - Temperature: {message.temperature}, Max Length: {message.max_length}, Top P: {message.top_p}"
+                # Tell the client which conversation this is before the first
+                # token, e.g. so a new chat can be routed right away
+                await manager.send_personal_message(
+                    client_id,
+                    {
+                        "status": "started",
+                        "conversation": {
+                            "id": conversation.id,
+                            "title": conversation.title,
+                            "created_at": conversation.created_at.isoformat(),
+                        },
+                    },
+                )
+
+                previous_messages = history
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Previous messages (%d): %s",
+                        len(previous_messages),
+                        previous_messages[-2:],
+                    )
+                logger.info(
+                    "Model settings - Temperature: %s, Max Length: %s, Top P: %s",
+                    message.temperature,
+                    message.max_length,
+                    message.top_p,
+                )
+                # Identical requests can be answered from the response cache
+                # when it is enabled (RESPONSE_CACHE_SIZE)
+                generation_params = {
+                    "max_new_tokens": message.max_length,
+                    "temperature": message.temperature,
+                    "top_p": message.top_p,
+                }
+                cache_key = None
+                cached_response = None
+                if response_cache.enabled:
+                    cache_key = response_cache.make_key(
+                        model_id, previous_messages, **generation_params
                     )
-                    # Start token generation
-                    full_response = ""
+                    cached_response = response_cache.get(cache_key)
+
+                # Start token generation
+                response_parts = []
+                stopped = False
+                failed = False
+                # A single listener task watches for "stop" while the
+                # tokens stream, instead of polling the socket per chunk
+                stop_event = manager.new_stop_event(client_id)
+                listener = asyncio.create_task(
+                    manager.listen_for_stop(client_id, stop_event)
+                )
+                try:
+                    # Tokens are merged into larger frames instead of one
+                    # websocket message per token
+                    if cached_response is not None:
+                        tokens = replay_text(cached_response)
+                    else:
+                        tokens = model.generate_stream(
+                            prompt=previous_messages, **generation_params
+                        )
+                    stream = coalesce_tokens(tokens)
                     try:
-                        async for token in model.generate_stream(
-                            prompt=previous_messages,
-                            # max_length=message.max_length,
-                            max_new_tokens=message.max_length,
-                            temperature=message.temperature,
-                            top_p=message.top_p,
-                        ):
+                        async for token in stream:
                             if token.startswith("Error:"):
                                 await manager.send_personal_message(
                                     client_id, {"error": token}
                                 )
+                                failed = True
                                 break
 
-                            full_response += token
-                            await manager.send_personal_message(
-                                client_id, {"token": token}
-                            )
-
-                            # Check after each token if we should continue
-                            # This enables immediate cancellation
-                            if await manager.check_for_stop_command(client_id):
+                            if stop_event.is_set():
                                 stopped = True
                                 break
 
-                        # Generation completed successfully.
-                        # If the generation was stopped, we don't store the response
-                        if full_response and not stopped:
-                            message_service.create_message(
-                                content=full_response,
-                                role="assistant",
-                                conversation_id=conversation.id,
-                            )
+                            response_parts.append(token)
+                            await manager.send_token(client_id, token)
+                    finally:
+                        # Closing the stream on stop, error or disconnect
+                        # also stops the model from generating further
+                        await stream.aclose()
+                        listener.cancel()
+                        (listener_result,) = await asyncio.gather(
+                            listener, return_exceptions=True
+                        )
+                    if isinstance(listener_result, WebSocketDisconnect):
+                        raise listener_result
 
-                        # Get the updated conversation to include in the response
-                        updated_conversation = conversation_service.get_conversation(
-                            conversation.id
+                    # Generation completed successfully.
+                    # If the generation was stopped, we don't store the response
+                    full_response = "".join(response_parts)
+                    store_response = bool(full_response) and not stopped
+                    if store_response:
+                        append_message(history, "assistant", full_response, merge_roles)
+                        if cache_key is not None and not failed:
+                            response_cache.put(cache_key, full_response)
+                        # Stored in the background so the completion frame
+                        # doesn't wait for the database
+                        persist_task = asyncio.create_task(
+                            _persist_message(
+                                full_response,
+                                "assistant",
+                                conversation.id,
+                                after=persist_task,
+                            )
                         )
+                        persist_conversation_id = conversation.id
 
-                        # Notify client that generation is complete and include conversation data
-                        await manager.send_personal_message(
-                            client_id,
-                            {
-                                "status": "complete",
-                                "conversation": {
-                                    "id": updated_conversation.id,
-                                    "title": updated_conversation.title,
-                                    "created_at": updated_conversation.created_at.isoformat(),
-                                    # "preview": updated_conversation.preview,
-                                    "lastMessageTimestamp": updated_conversation.created_at.isoformat(),
-                                },
+                    # Notify client that generation is complete and include conversation data
+                    await manager.send_personal_message(
+                        client_id,
+                        {
+                            "status": "complete",
+                            "conversation": {
+                                "id": conversation.id,
+                                "title": conversation.title,
+                                "created_at": conversation.created_at.isoformat(),
+                                # "preview": conversation.preview,
+                                "lastMessageTimestamp": conversation.created_at.isoformat(),
                             },
-                        )
+                        },
+                    )
 
-                    except Exception as e:
-                        logging.error(f"Error during streaming: {str(e)}")
-                        await manager.send_personal_message(
-                            client_id, {"error": str(e)}
-                        )
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    # The cached history may not match what was stored
+                    history_cache.pop(conversation.id, None)
+                    logger.error("Error during streaming: %s", e)
+                    await manager.send_personal_message(client_id, {"error": str(e)})
 
-                elif command == "stop":
-                    # Stop command is handled directly during generation
-                    pass
+            elif command == "stop":
+                # Stop command is handled directly during generation
+                pass
 
-                else:
-                    await manager.send_personal_message(
-                        client_id, {"error": f"Unknown command: {command}"}
-                    )
+            else:
+                await manager.send_personal_message(
+                    client_id, {"error": f"Unknown command: {command}"}
+                )
+        logger.info("WebSocket client disconnected: %s", client_id)
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
-        logging.info(f"WebSocket client disconnected: {client_id}")
+        # Raised by the stop listener when the client leaves mid-generation
+        logger.info("WebSocket client disconnected: %s", client_id)
     except Exception as e:
-        logging.error(f"WebSocket error: {str(e)}")
+        logger.error("WebSocket error: %s", e)
         await manager.send_personal_message(client_id, {"error": str(e)})
+    finally:
+        manager.disconnect(client_id)
+        # Let the last reply finish storing before the handler returns
+        if persist_task is not None:
+            await persist_task
@@ -1,12 +1,22 @@
 import uuid
 import logging
 import asyncio
-from typing import Dict, List
-from fastapi import WebSocket
+import orjson
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List
+from fastapi import WebSocket, WebSocketDisconnect
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ClientState:
+    """A connected client and the stop flag of its current generation"""
+
+    websocket: WebSocket
+    stop_event: asyncio.Event = field(default_factory=asyncio.Event)
+
+
 class ConnectionManager:
     """
     Manages WebSocket connections and communication between clients.
@@ -24,51 +34,114 @@ class ConnectionManager:
     def __init__(self):
         # Only initialize once
         if not ConnectionManager._initialized:
-            self.active_connections: Dict[str, WebSocket] = {}
+            self.active_connections: Dict[str, ClientState] = {}
             ConnectionManager._initialized = True
 
     async def connect(self, websocket: WebSocket) -> str:
         """Connect a client and return its unique ID"""
         client_id = str(uuid.uuid4())
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        self.active_connections[client_id] = ClientState(websocket)
         return client_id
 
     def disconnect(self, client_id: str):
         """Remove a client from active connections"""
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        state = self.active_connections.pop(client_id, None)
+        if state is not None:
+            # Let a running generation for this client end right away
+            state.stop_event.set()
+
+    def new_stop_event(self, client_id: str) -> asyncio.Event:
+        """Return a fresh stop flag for the client's next generation.
+
+        The flag is set by ``listen_for_stop`` and by ``disconnect``; it is
+        already set if the client is gone.
+        """
+        stop_event = asyncio.Event()
+        state = self.active_connections.get(client_id)
+        if state is None:
+            stop_event.set()
+        else:
+            state.stop_event = stop_event
+        return stop_event
 
     async def send_personal_message(self, client_id: str, message: dict):
         """Send a message to a specific client"""
         if client_id in self.active_connections:
-            await self.active_connections[client_id].send_json(message)
+            # orjson is much cheaper than send_json's json.dumps on the
+            # per-token path; frames stay text so the frontend is unchanged
+            await self.active_connections[client_id].websocket.send_text(
+                orjson.dumps(message).decode()
+            )
+
+    async def send_token(self, client_id: str, token: str):
+        """Send a streamed token to a specific client.
+
+        Token frames always have the same shape, so only the token itself is
+        encoded and spliced into the fixed frame text.
+        """
+        state = self.active_connections.get(client_id)
+        if state is not None:
+            await state.websocket.send_text(
+                '{"token":' + orjson.dumps(token).decode() + "}"
+            )
+
+    async def receive_message(self, client_id: str) -> dict:
+        """Receive a JSON message from a specific client.
+
+        Decoded with orjson rather than receive_json's stdlib json.loads.
+        """
+        websocket = self.active_connections[client_id].websocket
+        return orjson.loads(await websocket.receive_text())
+
+    async def iter_messages(self, client_id: str) -> AsyncIterator[dict]:
+        """Yield JSON messages from a client until it disconnects.
+
+        Like Starlette's iter_json, but decoded with orjson.
+        """
+        websocket = self.active_connections[client_id].websocket
+        try:
+            while True:
+                yield orjson.loads(await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
 
     async def broadcast(self, message: dict, exclude: List[str] = None):
         """Send a message to all connected clients, optionally excluding some"""
-        exclude = exclude or []
-        for client_id, connection in self.active_connections.items():
-            if client_id not in exclude:
-                await connection.send_json(message)
-
-    async def check_for_stop_command(
-        self, client_id: str, timeout: float = 0.001
-    ) -> bool:
-        """Check if client has sent a stop command with a very short timeout"""
-        if client_id not in self.active_connections:
-            return False
-
-        websocket = self.active_connections[client_id]
+        excluded = set(exclude or ())
+        data = orjson.dumps(message).decode()
+        # Snapshot the targets so clients (dis)connecting during the sends
+        # don't break the iteration, and send to all of them concurrently
+        targets = [
+            state.websocket
+            for client_id, state in self.active_connections.items()
+            if client_id not in excluded
+        ]
+        await asyncio.gather(
+            *(connection.send_text(data) for connection in targets),
+            return_exceptions=True,
+        )
+
+    async def listen_for_stop(self, client_id: str, stop_event: asyncio.Event):
+        """Read client messages during a generation until a stop command arrives.
+
+        Meant to run as a background task alongside the token loop, which only
+        has to check ``stop_event``. The event is also set if the client
+        disconnects, and the WebSocketDisconnect is left on the task.
+        """
+        state = self.active_connections.get(client_id)
+        if state is None:
+            stop_event.set()
+            return
+        websocket = state.websocket
         try:
-            # Non-blocking check for a stop message with a very short timeout
-            data = await asyncio.wait_for(websocket.receive_json(), timeout=timeout)
-            if data.get("command") == "stop":
-                logger.info(f"Generation stopped by client request: {client_id}")
-                return True
-        except asyncio.TimeoutError:
-            # No message received, continue generation
-            pass
-        return False
+            while True:
+                data = orjson.loads(await websocket.receive_text())
+                if data.get("command") == "stop":
+                    logger.info("Generation stopped by client request: %s", client_id)
+                    return
+        finally:
+            stop_event.set()
 
 
 # Create a singleton instance
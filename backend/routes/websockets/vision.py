@@ -1,17 +1,16 @@
-import os
 import logging
 import asyncio
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 
 from .connection import manager
-from ...services.user_service import UserService
 from ...services.conversation_service import ConversationService
 from ...services.message_service import MessageService
-from ...database import get_db_context
+from ...database import get_async_db_context, release_connection
 from ...schemas import WebSocketVisionChatInput
 from ...ml.factory import ModelFactory
-from ...utils.image_utils import UPLOADS_DIR
+from ...utils.image_utils import resolve_upload_path
+from ...utils.stream_utils import coalesce_tokens
 
 router = APIRouter()
 
@@ -21,14 +20,13 @@ logger = logging.getLogger(__name__)
 @router.websocket("/api/ws/vision/{model_id}")
 async def websocket_vision_chat(websocket: WebSocket, model_id: str):
     """Handle vision model interactions"""
-    logger.info(f"Vision WebSocket connection established for model: {model_id}")
+    logger.info("Vision WebSocket connection established for model: %s", model_id)
 
     client_id = await manager.connect(websocket)
-    logger.info(f"Vision client connected with ID: {client_id}")
+    logger.info("Vision client connected with ID: %s", client_id)
 
     # Check if model supports vision
     is_vision_model = ModelFactory.is_vision_model(model_id)
-    print(f"Is vision model: {is_vision_model}")
     if not is_vision_model:
         await manager.send_personal_message(
             client_id,
@@ -41,10 +39,11 @@ async def websocket_vision_chat(websocket: WebSocket, model_id: str):
         return
 
     # Get the vision model
-    model = await ModelFactory.get_model(model_id)
-    print(f"Vision model: {model}")
-    print(f"Model ID: {model_id}")
-    print("Starting vision chat...")
+    # Models are preloaded at startup, so this is normally a dict lookup
+    model = ModelFactory.get_loaded(model_id) or await ModelFactory.get_model(
+        model_id
+    )
+    logger.debug("Starting vision chat with model %s", model_id)
 
     # For testing, we can fake the token stream (faster while developing).
     async def fake_token_stream(tokens):
@@ -53,35 +52,40 @@ async def websocket_vision_chat(websocket: WebSocket, model_id: str):
             await asyncio.sleep(0.05)  # 1/20 = 0.05 seconds for 20 tokens per second
 
     try:
-        with get_db_context() as db:
-            user_service = UserService(db)
+        async with get_async_db_context() as db:
             conversation_service = ConversationService(db)
             message_service = MessageService(db)
 
-            # Get or create default user
-            user = user_service.get_or_create_default_user()
+            # Default user, resolved once at startup
+            user_id = websocket.app.state.default_user_id
             stopped = False
+            # Image names already checked on this socket; uploads are named
+            # by their content hash, so a resolved path stays valid
+            image_paths = {}
 
             while not stopped:
                 try:
+                    # Don't hold a pooled connection while waiting for the client
+                    await release_connection(db)
                     # Wait for a message from the client
-                    data = await websocket.receive_json()
+                    data = await manager.receive_message(client_id)
 
                     # Parse the user's message with image
-                    request = WebSocketVisionChatInput(**data)
-                    print(f"Vision request: {request}")
+                    request = WebSocketVisionChatInput.model_validate(data)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Vision request: %s", request)
 
                     if request.command == "stop":
                         logger.info(
-                            f"Received stop command from vision client: {client_id}"
+                            "Received stop command from vision client: %s", client_id
                         )
                         stopped = True
                         break
 
                     # Get or create conversation
                     if request.chat_id:
-                        conversation = conversation_service.get_conversation(
-                            request.chat_id
+                        conversation = await conversation_service.get_conversation(
+                            request.chat_id, with_messages=False
                         )
                         if not conversation:
                             raise HTTPException(
@@ -89,18 +93,26 @@ async def websocket_vision_chat(websocket: WebSocket, model_id: str):
                             )
                     else:
                         # Create a new vision conversation
-                        conversation = conversation_service.create_conversation(
+                        conversation = await conversation_service.create_conversation(
                             title="Vision Chat",
-                            user_id=user.id,
+                            user_id=user_id,
                         )
 
-                    # Get full image path
-                    image_path = os.path.join(UPLOADS_DIR, request.image_url)
-                    if not os.path.exists(image_path):
-                        raise FileNotFoundError(f"Image not found: {image_path}")
+                    # Get full image path; it must stay inside the uploads
+                    # directory, and the check runs off the event loop
+                    image_path = image_paths.get(request.image_url)
+                    if image_path is None:
+                        image_path = await asyncio.to_thread(
+                            resolve_upload_path, request.image_url
+                        )
+                        if image_path is None:
+                            raise FileNotFoundError(
+                                f"Image not found: {request.image_url}"
+                            )
+                        image_paths[request.image_url] = image_path
 
                     # Save user message to database with image URL
-                    user_message = message_service.create_message(
+                    user_message = await message_service.create_message(
                         content=request.message,
                         role="user",
                         conversation_id=conversation.id,
@@ -108,7 +120,7 @@ async def websocket_vision_chat(websocket: WebSocket, model_id: str):
                     )
 
                     # # Create an empty assistant message that we'll update as tokens come in
-                    # assistant_message = message_service.create_message(
+                    # assistant_message = await message_service.create_message(
                     #     content="",  # Empty content to start
                     #     role="assistant",
                     #     conversation_id=conversation.id,
@@ -124,64 +136,78 @@ async def websocket_vision_chat(websocket: WebSocket, model_id: str):
                     #     },
                     # )
 
+                    # Don't hold a pooled connection while the model generates
+                    await release_connection(db)
+
                     # Stream the response using image and prompt
-                    full_response = ""
-                    print("Generating response...")
-                    async for token in model.generate_stream_with_image(
-                        request.message, image_path
-                    ):
-                        full_response += token
-
-                        # Check for stop command
-                        if await manager.check_for_stop_command(client_id):
-                            logger.info("Vision generation stopped by client request")
-                            stopped = True
-                            break
-
-                        # Send token to the client
-                        await manager.send_personal_message(
-                            client_id,
-                            {
-                                "type": "token",
-                                "token": token,
-                                # "message_id": assistant_message.id,
-                            },
+                    response_parts = []
+                    # A listener task watches for "stop" while the tokens
+                    # stream, so the loop only checks an event per token
+                    stop_event = manager.new_stop_event(client_id)
+                    listener = asyncio.create_task(
+                        manager.listen_for_stop(client_id, stop_event)
+                    )
+                    # Tokens are merged into larger frames instead of one
+                    # websocket message per token
+                    stream = coalesce_tokens(
+                        model.generate_stream_with_image(request.message, image_path)
+                    )
+                    try:
+                        async for token in stream:
+                            # Check for stop command
+                            if stop_event.is_set():
+                                logger.info(
+                                    "Vision generation stopped by client request"
+                                )
+                                stopped = True
+                                break
+
+                            response_parts.append(token)
+
+                            # Send token to the client
+                            await manager.send_token(client_id, token)
+                    finally:
+                        # Closing the stream also stops the model generating
+                        await stream.aclose()
+                        listener.cancel()
+                        (listener_result,) = await asyncio.gather(
+                            listener, return_exceptions=True
                         )
+                    if isinstance(listener_result, WebSocketDisconnect):
+                        raise listener_result
 
                     # Generation completed successfully.
                     # If the generation was stopped, we don't store the response
+                    full_response = "".join(response_parts)
                     if full_response and not stopped:
-                        message_service.create_message(
+                        await message_service.create_message(
                             content=full_response,
                             role="assistant",
                             conversation_id=conversation.id,
                         )
 
-                    # Get the updated conversation to include in the response
-                    updated_conversation = conversation_service.get_conversation(
-                        conversation.id
-                    )
-
+                    # The conversation loaded above already has every field the
+                    # completion frame needs, so it isn't fetched again
                     await manager.send_personal_message(
                         client_id,
                         {
                             "status": "complete",
                             "conversation": {
-                                "id": updated_conversation.id,
-                                "title": updated_conversation.title,
-                                "created_at": updated_conversation.created_at.isoformat(),
-                                # "preview": updated_conversation.preview,
-                                "lastMessageTimestamp": updated_conversation.created_at.isoformat(),
+                                "id": conversation.id,
+                                "title": conversation.title,
+                                "created_at": conversation.created_at.isoformat(),
+                                # "preview": conversation.preview,
+                                "lastMessageTimestamp": conversation.created_at.isoformat(),
                             },
                         },
                     )
 
                 except WebSocketDisconnect:
-                    logger.info(f"Vision client disconnected: {client_id}")
+                    logger.info("Vision client disconnected: %s", client_id)
                     stopped = True
                     break
                 except Exception as e:
-                    logger.error(f"Error processing vision request: {str(e)}")
+                    logger.error("Error processing vision request: %s", e)
                     # Try to send error to client
                     try:
                         await manager.send_personal_message(
@@ -192,10 +218,10 @@ async def websocket_vision_chat(websocket: WebSocket, model_id: str):
 
         # Clean up
         manager.disconnect(client_id)
-        logger.info(f"Vision client connection closed: {client_id}")
+        logger.info("Vision client connection closed: %s", client_id)
 
     except Exception as e:
-        logger.error(f"Vision WebSocket error: {str(e)}")
+        logger.error("Vision WebSocket error: %s", e)
         # Try to send error to client
         try:
             await manager.send_personal_message(
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional, Literal
 
@@ -35,7 +35,12 @@ class WebSocketVisionChatInput(WebSocketChatInput):
     image_url: str = Field(..., description="URL or path to the uploaded image")
 
 
+# Response models are built server-side from trusted data, so they are frozen
+# and created with model_construct() to skip validation; only the *Input
+# models above validate their fields.
 class MessageResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     content: str
     role: str
@@ -44,6 +49,8 @@ class MessageResponse(BaseModel):
 
 
 class ConversationResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int
     title: str
     created_at: datetime
@@ -51,12 +58,16 @@ class ConversationResponse(BaseModel):
 
 
 class ChatResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     response: str = Field(..., description="The response from the assistant")
     message_id: int = Field(..., description="The ID of the assistant's message")
     conversation: ConversationResponse = Field(..., description="The conversation data")
 
 
 class ImageUploadResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     success: bool
     message: str
     image_url: Optional[str] = None
@@ -64,4 +75,6 @@ class ImageUploadResponse(BaseModel):
 
 
 class HealthResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     status: str
@@ -1,5 +1,5 @@
-from sqlalchemy.orm import Session
-from typing import Union, Dict, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Union, Dict
 import logging
 from functools import lru_cache
 from .user_service import UserService
@@ -7,15 +7,13 @@ from .conversation_service import ConversationService
 from .message_service import MessageService
 from .llm_service import LLMService
 from ..schemas import ChatResponse, ConversationResponse
-from ..models import Conversation, Message
+from ..models import Conversation
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class ChatService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.user_service = UserService(db)
         self.conversation_service = ConversationService(db)
@@ -24,67 +22,63 @@ class ChatService:
         self.llm_service = LLMService()
         # Simple in-memory cache for conversation data
         self._conversation_cache: Dict[int, Conversation] = {}
-        self._message_cache: Dict[int, List[Message]] = {}
 
     def _clear_cache_for_conversation(self, conversation_id: int) -> None:
         """Clear cached data for a specific conversation when it's modified"""
         if conversation_id in self._conversation_cache:
             del self._conversation_cache[conversation_id]
-        if conversation_id in self._message_cache:
-            del self._message_cache[conversation_id]
 
-    def get_cached_conversation(self, conversation_id: int) -> Conversation:
+    async def get_cached_conversation(self, conversation_id: int) -> Conversation:
         """Get conversation with caching to reduce database hits"""
         if conversation_id not in self._conversation_cache:
-            conversation = self.conversation_service.get_conversation(conversation_id)
+            conversation = await self.conversation_service.get_conversation(
+                conversation_id
+            )
             if conversation:
                 self._conversation_cache[conversation_id] = conversation
             return conversation
         return self._conversation_cache[conversation_id]
 
-    def get_cached_messages(self, conversation_id: int) -> List[Message]:
-        """Get conversation messages with caching to reduce database hits"""
-        if conversation_id not in self._message_cache:
-            messages = self.message_service.get_conversation_messages(conversation_id)
-            self._message_cache[conversation_id] = messages
-            return messages
-        return self._message_cache[conversation_id]
-
     async def process_chat_message(
         self, message: str, chat_id: Union[int, None] = None
     ) -> ChatResponse:
         """Process a chat message and return the response"""
         # Get or create default user (temporary until auth is implemented)
-        user = self.user_service.get_or_create_default_user()
+        user_id = await self.user_service.get_default_user_id()
 
         # Get existing conversation or create new one
         if chat_id:
-            conversation = self.get_cached_conversation(chat_id)
+            conversation = await self.get_cached_conversation(chat_id)
             if not conversation:
                 raise ValueError("Conversation not found")
+            # Messages are eagerly loaded with the conversation
+            history = list(conversation.messages)
         else:
-            conversation = self.conversation_service.create_conversation(
-                user.id, message
+            conversation = await self.conversation_service.create_conversation(
+                user_id, message
             )
             # Cache the new conversation
             self._conversation_cache[conversation.id] = conversation
+            history = []
 
         # Store user message
-        self.message_service.create_message(
+        user_message = await self.message_service.create_message(
             content=message, role="user", conversation_id=conversation.id
         )
         # Clear cache since we've modified the conversation
         self._clear_cache_for_conversation(conversation.id)
 
         try:
-            # Get conversation history for context
-            previous_messages = self.get_cached_messages(conversation.id)
+            # Conversation history is the already loaded messages plus the new
+            # user message, so no extra query is needed
+            previous_messages = history + [user_message]
             # Format the prompt including conversation history
             prompt = self._format_conversation_for_model(previous_messages)
-            logger.info(f"Prompt: {prompt}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Prompt (len=%d): %s", len(prompt), prompt[:200])
             # Generate response using the LLM service
             logger.info(
-                f"Generating response for message in conversation {conversation.id}"
+                "Generating response for message in conversation %s", conversation.id
             )
             response_text = await self.llm_service.generate(
                 prompt=prompt,
@@ -93,26 +87,26 @@ class ChatService:
             )
             # Check for errors
             if response_text.startswith("Error:"):
-                logger.error(f"LLM error: {response_text}")
+                logger.error("LLM error: %s", response_text)
                 response_text = (
                     "I apologize, but I encountered an error processing your request."
                 )
 
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
+            logger.error("Error generating response: %s", e)
             response_text = (
                 "I apologize, but I encountered an error processing your request."
             )
 
         # Store assistant response
-        assistant_message = self.message_service.create_message(
+        assistant_message = await self.message_service.create_message(
             content=response_text, role="assistant", conversation_id=conversation.id
         )
         # Clear cache since we've modified the conversation
         self._clear_cache_for_conversation(conversation.id)
 
         # Get latest message for preview
-        latest_message = self.message_service.get_latest_message(conversation.id)
+        latest_message = await self.message_service.get_latest_message(conversation.id)
 
         return ChatResponse(
             response=response_text,
@@ -1,12 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Union
 from ..repositories.conversation import ConversationRepository
 from ..models import Conversation
 import random
+from itertools import product
 
 
 class ConversationService:
-    def __init__(self, db: Session):
+    __slots__ = ("repository",)
+
+    def __init__(self, db: AsyncSession):
         self.repository = ConversationRepository(db)
 
     # Sample data for title generation (moved from main.py)
@@ -36,42 +39,45 @@ class ConversationService:
         "Investigation",
     ]
 
+    # Every adjective/topic pair, built once so a title is a single choice
+    _TITLE_COMBOS = [" ".join(pair) for pair in product(ADJECTIVES, TOPICS)]
+
     def generate_title(self, message: str) -> str:
         """Generate a title based on the message content or random words"""
-        words = message.split()
+        # Stop splitting after the third word; the rest of the message is unused
+        words = message.split(None, 3)
         if len(words) >= 3:
             return " ".join(words[:3]) + "..."
-        return f"{random.choice(self.ADJECTIVES)} {random.choice(self.TOPICS)}"
+        return random.choice(self._TITLE_COMBOS)
 
-    def create_conversation(self, user_id: int, title: str) -> Conversation:
+    async def create_conversation(self, user_id: int, title: str) -> Conversation:
         """Create a new conversation with a generated title"""
-        return self.repository.create(title=title, user_id=user_id)
+        return await self.repository.create(title=title, user_id=user_id)
 
-    def get_conversation(self, conversation_id: int) -> Union[Conversation, None]:
-        """Get a conversation by ID"""
-        return self.repository.get_conversation_with_messages(conversation_id)
+    async def get_conversation(
+        self, conversation_id: int, with_messages: bool = True
+    ) -> Union[Conversation, None]:
+        """Get a conversation by ID, optionally with its messages loaded"""
+        if not with_messages:
+            return await self.repository.get(conversation_id)
+        return await self.repository.get_conversation_with_messages(conversation_id)
 
-    def get_user_conversations(self, user_id: int) -> List[Dict[str, Any]]:
+    async def get_user_conversations(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all conversations for a user with their latest messages"""
-        conversations = self.repository.get_user_conversations(user_id)
-
-        # Format the conversations for API response
-        result = []
-        seen_conversations = set()
+        conversations = await self.repository.get_user_conversations(user_id)
 
-        for conv, msg in conversations:
-            if conv.id not in seen_conversations:
-                seen_conversations.add(conv.id)
-                result.append(
-                    {
-                        "id": conv.id,
-                        "title": conv.title,
-                        "created_at": conv.created_at.isoformat(),
-                        "preview": msg.content if msg else None,
-                    }
-                )
-        return result
+        # Format the conversations for API response; orjson serializes the
+        # datetimes natively
+        return [
+            {
+                "id": conv.id,
+                "title": conv.title,
+                "created_at": conv.created_at,
+                "preview": preview,
+            }
+            for conv, preview in conversations
+        ]
 
-    def delete_conversation(self, conversation_id: int) -> bool:
+    async def delete_conversation(self, conversation_id: int) -> bool:
         """Delete a conversation and all its associated messages"""
-        return self.repository.delete(conversation_id)
+        return await self.repository.delete(conversation_id)
@@ -1,10 +1,9 @@
 from typing import AsyncGenerator, Dict, Any, Optional
 import logging
 
-from ..my_ml.model_interface import ModelInterface
+from ..ml.config import MODEL_CONFIGS
+from ..my_ml.model_interface import get_model_interface
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -27,7 +26,10 @@ class LLMService:
         """Initialize the service and model if not already initialized"""
         if not LLMService._initialized:
             logger.info("Initializing LLM service")
-            self.model_interface = ModelInterface()
+            # Share the warmed model with the "mygpt" entry of the model factory
+            self.model_interface = get_model_interface(
+                MODEL_CONFIGS["mygpt"]["model_name"]
+            )
             LLMService._initialized = True
             logger.info("LLM service initialized")
 
@@ -59,7 +61,9 @@ class LLMService:
 
             # Log request
             logger.info(
-                f"Processing generation request: {len(prompt)} chars, max_len={max_length}"
+                "Processing generation request: %d chars, max_len=%s",
+                len(prompt),
+                max_length,
             )
 
             # Stream tokens from the model
@@ -73,7 +77,7 @@ class LLMService:
                 yield token
 
         except Exception as e:
-            logger.error(f"Error in LLM service: {str(e)}")
+            logger.error("Error in LLM service: %s", e)
             yield f"Error: {str(e)}"
 
     async def generate(
@@ -100,5 +104,5 @@ class LLMService:
                 prompt=prompt, max_length=max_length, temperature=temperature, **kwargs
             )
         except Exception as e:
-            logger.error(f"Error in LLM service generate: {str(e)}")
+            logger.error("Error in LLM service generate: %s", e)
             return f"Error: {str(e)}"
@@ -1,14 +1,17 @@
-from sqlalchemy.orm import Session
-from typing import List, Union, Dict, Optional
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Sequence, Tuple, Union, Dict, Optional
 from ..repositories.message import MessageRepository
 from ..models import Message
 
 
 class MessageService:
-    def __init__(self, db: Session):
+    __slots__ = ("repository",)
+
+    def __init__(self, db: AsyncSession):
         self.repository = MessageRepository(db)
 
-    def create_message(
+    async def create_message(
         self,
         content: str,
         role: str,
@@ -16,30 +19,45 @@ class MessageService:
         image_url: Optional[str] = None,
     ) -> Message:
         """Create a new message with optional image URL"""
-        return self.repository.create(
+        return await self.repository.create(
             content=content,
             role=role,
             conversation_id=conversation_id,
             image_url=image_url,
         )
 
-    def get_conversation_messages(self, conversation_id: int) -> List[Message]:
+    async def get_conversation_messages(self, conversation_id: int) -> List[Message]:
         """Get all messages for a conversation"""
-        return self.repository.get_conversation_messages(conversation_id)
+        return await self.repository.get_conversation_messages(conversation_id)
+
+    async def get_conversation_history(
+        self, conversation_id: int
+    ) -> List[Tuple[str, str]]:
+        """Get the (role, content) pairs of a conversation for prompting"""
+        return await self.repository.get_conversation_history(conversation_id)
 
-    def get_latest_message(self, conversation_id: int) -> Union[Message, None]:
+    async def get_latest_message(self, conversation_id: int) -> Union[Message, None]:
         """Get the latest message in a conversation"""
-        return self.repository.get_latest_message(conversation_id)
+        return await self.repository.get_latest_message(conversation_id)
+
+    async def get_conversation_message_rows(
+        self, conversation_id: int
+    ) -> Sequence[Row]:
+        """Get the (id, content, role, created_at, image_url) rows of a conversation"""
+        return await self.repository.get_conversation_message_rows(conversation_id)
+
+    def format_messages_for_response(self, rows: Sequence[Row]) -> List[Dict]:
+        """Format message rows for API response.
 
-    def format_messages_for_response(self, messages: List[Message]) -> List[Dict]:
-        """Format messages for API response"""
+        Timestamps are left as datetimes; orjson serializes them natively.
+        """
         return [
             {
-                "id": str(message.id),
-                "content": message.content,
-                "role": message.role,
-                "timestamp": message.created_at.isoformat(),
-                "image_url": message.image_url,
+                "id": str(id),
+                "content": content,
+                "role": role,
+                "timestamp": created_at,
+                "image_url": image_url,
             }
-            for message in messages
+            for id, content, role, created_at, image_url in rows
         ]
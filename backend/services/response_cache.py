@@ -0,0 +1,52 @@
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+# Number of generated responses kept for reuse; 0 (the default) disables the
+# cache, since a sampled model would otherwise always repeat the same answer
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "0"))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+class ResponseCache:
+    """LRU cache of complete model responses.
+
+    Keys combine the model, the normalized conversation and the sampling
+    settings, so a repeated question in the same context is answered without
+    running the model again. Whitespace and case differences are ignored.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(
+        model_id: str, messages: Iterable[Dict[str, str]], **params: Any
+    ) -> Tuple:
+        turns = tuple((m["role"], _normalize(m["content"])) for m in messages)
+        return model_id, turns, tuple(sorted(params.items()))
+
+    def get(self, key: Hashable) -> Optional[str]:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: Hashable, response: str) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
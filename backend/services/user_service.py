@@ -1,21 +1,43 @@
-from sqlalchemy.orm import Session
-from typing import Union
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Union
 from ..repositories.user import UserRepository
 from ..models import User
 
 
 class UserService:
-    def __init__(self, db: Session):
+    __slots__ = ("repository",)
+
+    # The default user never changes once created, so its id is cached for
+    # the lifetime of the process
+    _default_user_id: Optional[int] = None
+    # Serializes the first lookup so concurrent requests don't all query (or
+    # race to create) the default user; created lazily on the running loop
+    _default_user_lock: Optional[asyncio.Lock] = None
+
+    def __init__(self, db: AsyncSession):
         self.repository = UserRepository(db)
 
-    def get_user(self, user_id: int) -> Union[User, None]:
-        return self.repository.get(user_id)
+    async def get_user(self, user_id: int) -> Union[User, None]:
+        return await self.repository.get(user_id)
+
+    async def get_or_create_default_user(self) -> User:
+        user = await self.repository.get_or_create_default_user()
+        UserService._default_user_id = user.id
+        return user
 
-    def get_or_create_default_user(self) -> User:
-        return self.repository.get_or_create_default_user()
+    async def get_default_user_id(self) -> int:
+        """Get the default user's id, only hitting the database on first use"""
+        if UserService._default_user_id is None:
+            if UserService._default_user_lock is None:
+                UserService._default_user_lock = asyncio.Lock()
+            async with UserService._default_user_lock:
+                if UserService._default_user_id is None:
+                    await self.get_or_create_default_user()
+        return UserService._default_user_id
 
-    def create_user(self, username: str) -> User:
-        return self.repository.create(username=username)
+    async def create_user(self, username: str) -> User:
+        return await self.repository.create(username=username)
 
-    def get_by_username(self, username: str) -> Union[User, None]:
-        return self.repository.get_by_username(username)
+    async def get_by_username(self, username: str) -> Union[User, None]:
+        return await self.repository.get_by_username(username)
@@ -1,15 +1,21 @@
 import os
+import asyncio
 import uuid
+import logging
 import base64
+import hashlib
 from typing import Optional, Tuple
+from fastapi import UploadFile
 from PIL import Image
-from io import BytesIO
 
 
+logger = logging.getLogger(__name__)
+
 UPLOADS_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads"
 )
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
 
 def ensure_upload_dir():
@@ -17,54 +23,110 @@ def ensure_upload_dir():
     os.makedirs(UPLOADS_DIR, exist_ok=True)
 
 
+def resolve_upload_path(image_url: str) -> Optional[str]:
+    """
+    Resolve an uploaded image name to its file in the uploads directory
+
+    This touches the filesystem, so call it from a worker thread.
+
+    Args:
+        image_url: The image name sent by the client
+
+    Returns:
+        The file path, or None if it points outside the uploads directory
+        or doesn't exist
+    """
+    uploads_dir = os.path.realpath(UPLOADS_DIR)
+    image_path = os.path.realpath(os.path.join(uploads_dir, image_url))
+    if os.path.commonpath([uploads_dir, image_path]) != uploads_dir:
+        return None
+    if not os.path.isfile(image_path):
+        return None
+    return image_path
+
+
 def allowed_file(filename: str) -> bool:
     """Check if the file has an allowed extension"""
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def save_uploaded_image(
-    file_data: bytes, original_filename: str
+def _verify_image(path: str) -> None:
+    """Raise if the file at path is not a valid image"""
+    with Image.open(path) as img:
+        img.verify()
+
+
+def _remove_if_exists(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def save_uploaded_image_stream(
+    upload: UploadFile, original_filename: str
 ) -> Tuple[bool, str, Optional[str]]:
     """
-    Save an uploaded image to disk
+    Stream an uploaded image to disk chunk by chunk
+
+    The upload is written to a temporary file as it is received, so only a
+    single chunk is held in memory. A BLAKE2b digest is computed over the
+    chunks on the fly and used as the final filename, so identical images
+    share one file without a second pass over the bytes. The file is
+    validated once it is complete and then renamed to its final location.
 
     Args:
-        file_data: The binary data of the file
+        upload: The uploaded file
         original_filename: The original filename
 
     Returns:
         Tuple of (success, message, file_path)
     """
+    temp_path = None
     try:
-        # Ensure the uploads directory exists
-        ensure_upload_dir()
-
         # Check if the file has an allowed extension
         if not allowed_file(original_filename):
             return False, "File type not allowed", None
 
-        # Generate a unique filename
-        file_extension = original_filename.rsplit(".", 1)[1].lower()
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
+        # Ensure the uploads directory exists
+        await asyncio.to_thread(ensure_upload_dir)
 
-        # Create the full file path
-        file_path = os.path.join(UPLOADS_DIR, unique_filename)
+        file_extension = original_filename.rsplit(".", 1)[1].lower()
+        temp_path = os.path.join(UPLOADS_DIR, f"{uuid.uuid4()}.part")
 
-        # Validate and save the image
+        # Write the upload to disk as it arrives, hashing it along the way.
+        # File I/O runs in a worker thread so it doesn't block the event loop
+        size = 0
+        hasher = hashlib.blake2b(digest_size=16)
+        out = await asyncio.to_thread(open, temp_path, "wb")
         try:
-            img = Image.open(BytesIO(file_data))
-            img.verify()  # Verify it's a valid image
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(out.write, chunk)
+                hasher.update(chunk)
+                size += len(chunk)
+        finally:
+            await asyncio.to_thread(out.close)
 
-            # Reopen because verify() closes the file
-            img = Image.open(BytesIO(file_data))
-            img.save(file_path)
+        if not size:
+            return False, "Invalid image file: empty upload", None
 
-            return True, "File uploaded successfully", file_path
+        # Validate the image
+        try:
+            await asyncio.to_thread(_verify_image, temp_path)
         except Exception as e:
             return False, f"Invalid image file: {str(e)}", None
 
+        file_path = os.path.join(
+            UPLOADS_DIR, f"{hasher.hexdigest()}.{file_extension}"
+        )
+        await asyncio.to_thread(os.replace, temp_path, file_path)
+        temp_path = None
+        return True, "File uploaded successfully", file_path
+
     except Exception as e:
         return False, f"Error saving image: {str(e)}", None
+    finally:
+        # Don't leave partial or invalid uploads behind
+        if temp_path:
+            await asyncio.to_thread(_remove_if_exists, temp_path)
 
 
 def decode_base64_image(
@@ -91,5 +153,5 @@ def decode_base64_image(
         # Decode the base64 data
         return base64.b64decode(base64_data)
     except Exception as e:
-        print(f"Error decoding base64 image: {str(e)}")
+        logger.error("Error decoding base64 image: %s", e)
         return None
@@ -1,12 +1,38 @@
 from typing import List, Dict, Any
-from itertools import groupby
 
 
 def fix_gemma_messages(messages: List[Dict[str, Any]]):
     """Fix the Gemma messages to alternate user/assistant/user/assistant/"""
+    # Single pass: consecutive messages with the same role are collected and
+    # joined once when the role changes
     grouped = []
-    for role, group in groupby(messages, key=lambda x: x["role"]):
-        contents = [msg["content"] for msg in group]
-        merged = "\n".join(contents)
-        grouped.append({"role": role, "content": merged})
+    role = None
+    contents: List[str] = []
+    for msg in messages:
+        if msg["role"] != role:
+            if contents:
+                grouped.append({"role": role, "content": "\n".join(contents)})
+            role = msg["role"]
+            contents = []
+        contents.append(msg["content"])
+    if contents:
+        grouped.append({"role": role, "content": "\n".join(contents)})
     return grouped
+
+
+def append_message(
+    messages: List[Dict[str, Any]], role: str, content: str, merge_roles: bool = False
+) -> None:
+    """Append a message to a history list in place.
+
+    With ``merge_roles`` the list is kept in the form produced by
+    ``fix_gemma_messages``: a message repeating the last role is joined into
+    the last entry instead of added after it.
+    """
+    if merge_roles and messages and messages[-1]["role"] == role:
+        messages[-1] = {
+            "role": role,
+            "content": messages[-1]["content"] + "\n" + content,
+        }
+    else:
+        messages.append({"role": role, "content": content})
@@ -0,0 +1,98 @@
+import asyncio
+from typing import AsyncGenerator, AsyncIterator, List
+
+# Flush a coalesced chunk once it holds this many characters...
+COALESCE_MAX_CHARS = 4096
+# ...or once its first token has waited this long (seconds)
+COALESCE_MAX_DELAY = 0.015
+# Tokens the model may run ahead of the websocket before it has to wait
+COALESCE_QUEUE_SIZE = 64
+
+_END = object()
+
+
+async def coalesce_tokens(
+    tokens: AsyncIterator[str],
+    max_chars: int = COALESCE_MAX_CHARS,
+    max_delay: float = COALESCE_MAX_DELAY,
+) -> AsyncGenerator[str, None]:
+    """Merge a fast token stream into fewer, larger chunks.
+
+    The source is consumed by a background task, so the model keeps producing
+    while the caller is busy sending. Buffered tokens are flushed when they
+    reach ``max_chars`` or when the oldest one has waited ``max_delay``
+    seconds, which keeps the stream interactive while cutting the number of
+    websocket frames. The queue is bounded, so a slow client applies
+    backpressure to the model instead of letting tokens pile up in memory.
+    Tokens starting with "Error:" are passed through on their own so callers
+    can still detect them.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=COALESCE_QUEUE_SIZE)
+
+    async def produce() -> None:
+        try:
+            async for token in tokens:
+                await queue.put(token)
+        except Exception as e:
+            await queue.put(e)
+            return
+        # Not in a finally: on cancellation a full queue would block forever
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    loop = asyncio.get_running_loop()
+    buffer: List[str] = []
+    size = 0
+    deadline = 0.0
+    getter = None
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            if buffer:
+                # Keep the pending get() alive across timeouts so no token is lost
+                done, _ = await asyncio.wait(
+                    {getter}, timeout=max(0.0, deadline - loop.time())
+                )
+                if not done:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    size = 0
+                    continue
+            item = await getter
+            getter = None
+
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                if buffer:
+                    yield "".join(buffer)
+                raise item
+            if item.startswith("Error:"):
+                if buffer:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    size = 0
+                yield item
+                continue
+
+            if not buffer:
+                deadline = loop.time() + max_delay
+            buffer.append(item)
+            size += len(item)
+            if size >= max_chars:
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if getter is not None:
+            getter.cancel()
+        producer.cancel()
+
+
+async def replay_text(text: str) -> AsyncGenerator[str, None]:
+    """Stream an already complete response, e.g. one served from a cache"""
+    yield text